@@ -4,13 +4,129 @@ import argparse
 import os
 import sys
 
-from files_gestor.purge import purge_by_type, purge_small_images, purge_short_videos
+from files_gestor.purge import (
+    PurgeConfig,
+    dedupe_videos,
+    merge_reports,
+    purge_app_junk,
+    purge_by_type,
+    purge_corrupt,
+    purge_known,
+    purge_small_images,
+    purge_short_videos,
+)
+from files_gestor.library import DEFAULT_INDEX_DIR, build_index
+from files_gestor.quarantine import list_runs, purge_run, restore_run
 from files_gestor.rules import (
     DEFAULT_ALLOWED_EXTENSIONS,
+    DedupeVideosConfig,
+    PurgeAppJunkConfig,
     PurgeByTypeConfig,
+    PurgeCorruptConfig,
+    PurgeKnownConfig,
     PurgeShortVideosConfig,
     PurgeSmallImagesConfig,
 )
+from files_gestor.scan import list_recup_dirs, plan_shards, write_shard_plan
+from files_gestor.thumbs import (
+    DEFAULT_CACHE_DIR,
+    DEFAULT_CACHE_MAX_BYTES,
+    PER_PAGE,
+    THUMB_SIZE,
+    review_thumbs,
+)
+
+
+def _parse_shard(value: str) -> tuple[int, int]:
+    try:
+        index_str, count_str = value.split("/")
+        index, count = int(index_str), int(count_str)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Formato esperado I/N, recibido: {value}")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"Se requiere 0 <= I < N, recibido: {value}")
+    return index, count
+
+
+_SIZE_UNITS = {"": 1, "K": 1_000, "M": 1_000_000, "G": 1_000_000_000, "T": 1_000_000_000_000}
+
+
+def _parse_size(value: str) -> int:
+    """Convierte '200G', '500M', '1.5T' o '1000' a bytes."""
+    text = value.strip().upper().removesuffix("B")
+    unit = text[-1:] if text[-1:] in _SIZE_UNITS else ""
+    try:
+        number = float(text[: len(text) - len(unit)])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Tamaño inválido: {value}")
+    return int(number * _SIZE_UNITS[unit])
+
+
+def _add_yes_arg(p: argparse.ArgumentParser) -> None:
+    p.add_argument(
+        "--yes",
+        action="store_true",
+        help="No pide confirmación (para scripts y ejecuciones desatendidas).",
+    )
+
+
+def _add_run_args(p: argparse.ArgumentParser) -> None:
+    _add_yes_arg(p)
+    p.add_argument(
+        "--quarantine",
+        default=None,
+        help="Mueve a esta carpeta (mismo disco) en lugar de borrar. Reversible con 'restore'.",
+    )
+    p.add_argument(
+        "--shard",
+        type=_parse_shard,
+        default=(0, 1),
+        help="Procesa solo la parte I de N (0 <= I < N) de las carpetas recup_dir*.",
+    )
+    p.add_argument(
+        "--shard-plan",
+        default=None,
+        help="Plan de reparto por bytes creado con 'plan-shards' (default: hash del nombre).",
+    )
+    p.add_argument(
+        "--reclaim-target",
+        type=_parse_size,
+        default=None,
+        help="Borra primero lo más grande y para al liberar este tamaño (ej: 200G, 500M).",
+    )
+
+
+def _run_kwargs(args: argparse.Namespace) -> dict:
+    """Opciones comunes a todos los comandos purge-*."""
+    shard_index, shard_count = args.shard
+    return {
+        "quarantine_dir": os.path.abspath(args.quarantine) if args.quarantine else None,
+        "shard_index": shard_index,
+        "shard_count": shard_count,
+        "shard_plan": os.path.abspath(args.shard_plan) if args.shard_plan else None,
+        "reclaim_target_bytes": args.reclaim_target,
+    }
+
+
+def _ask_borrar() -> bool:
+    confirm = input("Escribe 'BORRAR' para confirmar: ").strip()
+    if confirm != "BORRAR":
+        print("Cancelado.")
+        return False
+    return True
+
+
+def _confirm_apply(args: argparse.Namespace, cfg: PurgeConfig, filter_line: str) -> bool:
+    """Pide confirmación antes de un borrado real, salvo en dry-run o con --yes."""
+    if cfg.dry_run or args.yes:
+        return True
+
+    print("ATENCIÓN: BORRADO REAL ACTIVO.")
+    print(f"Root: {cfg.root_dir}")
+    print(filter_line)
+    if cfg.quarantine_dir:
+        print(f"Cuarentena: {cfg.quarantine_dir} (reversible con 'restore')")
+    return _ask_borrar()
 
 
 def _build_parser() -> argparse.ArgumentParser:
@@ -33,6 +149,7 @@ def _build_parser() -> argparse.ArgumentParser:
         default="recup_dir",
         help="Prefijo de carpetas a procesar (default: recup_dir)",
     )
+    _add_run_args(p_purge)
     p_purge.add_argument(
         "--noext-delete-below-mb",
         type=float,
@@ -56,6 +173,7 @@ def _build_parser() -> argparse.ArgumentParser:
         default="recup_dir",
         help="Prefijo de carpetas a procesar (default: recup_dir)",
     )
+    _add_run_args(p_small)
     p_small.add_argument(
         "--min-width",
         type=int,
@@ -91,6 +209,7 @@ def _build_parser() -> argparse.ArgumentParser:
         default="recup_dir",
         help="Prefijo de carpetas a procesar (default: recup_dir)",
     )
+    _add_run_args(p_video)
     p_video.add_argument(
         "--min-duration",
         type=float,
@@ -104,6 +223,230 @@ def _build_parser() -> argparse.ArgumentParser:
         help="Tamaño mínimo en KB (default: 500)",
     )
 
+    # ── purge-corrupt ──
+    p_corrupt = sub.add_parser(
+        "purge-corrupt",
+        help="Elimina imágenes y videos truncados o corruptos (solo lee cabecera y cola).",
+    )
+    p_corrupt.add_argument("--root", required=True, help="Ruta a testdisk-7.3-WIP")
+    p_corrupt.add_argument(
+        "--apply",
+        action="store_true",
+        help="Ejecuta borrado real (si no se indica, es dry-run).",
+    )
+    p_corrupt.add_argument(
+        "--recup-prefix",
+        default="recup_dir",
+        help="Prefijo de carpetas a procesar (default: recup_dir)",
+    )
+    _add_run_args(p_corrupt)
+
+    # ── purge-app-junk ──
+    p_junk = sub.add_parser(
+        "purge-app-junk",
+        help="Elimina capturas de pantalla e imágenes reenviadas por WhatsApp/Telegram (solo cabeceras).",
+    )
+    p_junk.add_argument("--root", required=True, help="Ruta a testdisk-7.3-WIP")
+    p_junk.add_argument(
+        "--apply",
+        action="store_true",
+        help="Ejecuta borrado real (si no se indica, es dry-run).",
+    )
+    p_junk.add_argument(
+        "--recup-prefix",
+        default="recup_dir",
+        help="Prefijo de carpetas a procesar (default: recup_dir)",
+    )
+    _add_run_args(p_junk)
+    p_junk.add_argument(
+        "--messaging-max-quality",
+        type=int,
+        default=85,
+        help="Calidad JPEG máxima estimada para tratar una imagen como reenviada (default: 85)",
+    )
+
+    # ── dedupe-videos ──
+    p_dedupe = sub.add_parser(
+        "dedupe-videos",
+        help="Elimina videos casi duplicados (re-encodes, copias) dejando el de mayor resolución.",
+    )
+    p_dedupe.add_argument("--root", required=True, help="Ruta a testdisk-7.3-WIP")
+    p_dedupe.add_argument(
+        "--apply",
+        action="store_true",
+        help="Ejecuta borrado real (si no se indica, es dry-run).",
+    )
+    p_dedupe.add_argument(
+        "--recup-prefix",
+        default="recup_dir",
+        help="Prefijo de carpetas a procesar (default: recup_dir)",
+    )
+    _add_run_args(p_dedupe)
+    p_dedupe.add_argument(
+        "--frames",
+        type=int,
+        default=8,
+        help="Frames muestreados por video (default: 8)",
+    )
+    p_dedupe.add_argument(
+        "--max-distance",
+        type=float,
+        default=10.0,
+        help="Distancia dHash media por frame, de 64 bits (default: 10)",
+    )
+    p_dedupe.add_argument(
+        "--duration-tolerance",
+        type=float,
+        default=1.0,
+        help="Diferencia máxima de duración en segundos (default: 1.0)",
+    )
+    p_dedupe.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Procesos ffmpeg en paralelo (default: 8)",
+    )
+
+    # ── library ──
+    p_index = sub.add_parser(
+        "index-library",
+        help="Hashea una biblioteca de referencia (backup de fotos) en un índice local.",
+    )
+    p_index.add_argument("--library", required=True, help="Ruta de la biblioteca de referencia")
+    p_index.add_argument(
+        "--index",
+        default=DEFAULT_INDEX_DIR,
+        help=f"Carpeta del índice (default: {DEFAULT_INDEX_DIR})",
+    )
+    p_index.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Archivos hasheados en paralelo (default: 8)",
+    )
+
+    p_known = sub.add_parser(
+        "purge-known",
+        help="Elimina archivos recuperados que ya existen en la biblioteca indexada.",
+    )
+    p_known.add_argument("--root", required=True, help="Ruta a testdisk-7.3-WIP")
+    p_known.add_argument(
+        "--apply",
+        action="store_true",
+        help="Ejecuta borrado real (si no se indica, es dry-run).",
+    )
+    p_known.add_argument(
+        "--recup-prefix",
+        default="recup_dir",
+        help="Prefijo de carpetas a procesar (default: recup_dir)",
+    )
+    _add_run_args(p_known)
+    p_known.add_argument(
+        "--index",
+        default=DEFAULT_INDEX_DIR,
+        help=f"Carpeta del índice creado con index-library (default: {DEFAULT_INDEX_DIR})",
+    )
+
+    # ── quarantine ──
+    p_restore = sub.add_parser(
+        "restore",
+        help="Devuelve a su sitio los archivos de una ejecución en cuarentena.",
+    )
+    p_restore.add_argument("run_id", help="Id de la ejecución (nombre de su carpeta)")
+    p_restore.add_argument("--quarantine", required=True, help="Carpeta de cuarentena")
+    p_restore.add_argument(
+        "--workers",
+        type=int,
+        default=16,
+        help="Renames en paralelo (default: 16)",
+    )
+
+    p_pq = sub.add_parser(
+        "purge-quarantine",
+        help="Borra definitivamente ejecuciones en cuarentena (todas si no se indican).",
+    )
+    p_pq.add_argument("run_ids", nargs="*", help="Ids de ejecución (default: todas)")
+    p_pq.add_argument("--quarantine", required=True, help="Carpeta de cuarentena")
+    _add_yes_arg(p_pq)
+    p_pq.add_argument(
+        "--workers",
+        type=int,
+        default=16,
+        help="Borrados en paralelo (default: 16)",
+    )
+
+    # ── plan-shards ──
+    p_plan = sub.add_parser(
+        "plan-shards",
+        help="Calcula una vez el reparto por bytes de recup_dir* para usar con --shard-plan.",
+    )
+    p_plan.add_argument("--root", required=True, help="Ruta a testdisk-7.3-WIP")
+    p_plan.add_argument("--shards", type=int, required=True, help="Número de shards (N)")
+    p_plan.add_argument("--output", required=True, help="Archivo JSON del plan (compartido)")
+    p_plan.add_argument(
+        "--recup-prefix",
+        default="recup_dir",
+        help="Prefijo de carpetas a procesar (default: recup_dir)",
+    )
+
+    # ── merge-reports ──
+    p_merge = sub.add_parser(
+        "merge-reports",
+        help="Une los reportes CSV de varios shards y suma sus totales.",
+    )
+    p_merge.add_argument("reports", nargs="+", help="Reportes CSV a unir")
+    p_merge.add_argument(
+        "--output",
+        default=None,
+        help="CSV de salida (default: merged_<fecha>.csv junto al primer reporte)",
+    )
+
+    # ── review-thumbs ──
+    p_review = sub.add_parser(
+        "review-thumbs",
+        help="Genera hojas de contacto HTML con miniaturas de un reporte, agrupadas por motivo.",
+    )
+    p_review.add_argument("report", help="Reporte CSV (normalmente de un dry-run)")
+    p_review.add_argument(
+        "--output",
+        default=None,
+        help="Carpeta de salida (default: <reporte>_review junto al reporte)",
+    )
+    p_review.add_argument(
+        "--cache",
+        default=DEFAULT_CACHE_DIR,
+        help=f"Caché de miniaturas (default: {DEFAULT_CACHE_DIR})",
+    )
+    p_review.add_argument(
+        "--cache-max",
+        type=_parse_size,
+        default=DEFAULT_CACHE_MAX_BYTES,
+        help="Tamaño máximo de la caché; expulsa las menos usadas (default: 1G)",
+    )
+    p_review.add_argument(
+        "--size",
+        type=int,
+        default=THUMB_SIZE,
+        help=f"Lado máximo de la miniatura en px (default: {THUMB_SIZE})",
+    )
+    p_review.add_argument(
+        "--per-page",
+        type=int,
+        default=PER_PAGE,
+        help=f"Miniaturas por página (default: {PER_PAGE})",
+    )
+    p_review.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Procesos para generar miniaturas (default: nº de CPUs)",
+    )
+    p_review.add_argument(
+        "--all",
+        action="store_true",
+        help="Incluye también las filas 'keep' (default: solo 'delete')",
+    )
+
     return parser
 
 
@@ -121,16 +464,11 @@ def main(argv: list[str] | None = None) -> int:
             process_recup_prefix=args.recup_prefix,
             no_extension_delete_below_bytes=int(args.noext_delete_below_mb * 1_000_000),
             allowed_extensions=DEFAULT_ALLOWED_EXTENSIONS,
+            **_run_kwargs(args),
         )
 
-        if not cfg.dry_run:
-            print("ATENCIÓN: BORRADO REAL ACTIVO.")
-            print(f"Root: {cfg.root_dir}")
-            print(f"Solo se procesarán carpetas: {cfg.process_recup_prefix}*")
-            confirm = input("Escribe 'BORRAR' para confirmar: ").strip()
-            if confirm != "BORRAR":
-                print("Cancelado.")
-                return 2
+        if not _confirm_apply(args, cfg, f"Solo se procesarán carpetas: {cfg.process_recup_prefix}*"):
+            return 2
 
         purge_by_type(cfg)
         return 0
@@ -146,16 +484,11 @@ def main(argv: list[str] | None = None) -> int:
             min_width=args.min_width,
             min_height=args.min_height,
             max_aspect_ratio=args.max_aspect_ratio,
+            **_run_kwargs(args),
         )
 
-        if not cfg.dry_run:
-            print("ATENCIÓN: BORRADO REAL ACTIVO.")
-            print(f"Root: {cfg.root_dir}")
-            print(f"Filtro: imágenes < {cfg.min_width}x{cfg.min_height} px o aspect ratio > {cfg.max_aspect_ratio}")
-            confirm = input("Escribe 'BORRAR' para confirmar: ").strip()
-            if confirm != "BORRAR":
-                print("Cancelado.")
-                return 2
+        if not _confirm_apply(args, cfg, f"Filtro: imágenes < {cfg.min_width}x{cfg.min_height} px o aspect ratio > {cfg.max_aspect_ratio}"):
+            return 2
 
         purge_small_images(cfg)
         return 0
@@ -170,20 +503,168 @@ def main(argv: list[str] | None = None) -> int:
             process_recup_prefix=args.recup_prefix,
             min_duration_secs=args.min_duration,
             min_size_bytes=int(args.min_size_kb * 1_000),
+            **_run_kwargs(args),
         )
 
-        if not cfg.dry_run:
-            print("ATENCIÓN: BORRADO REAL ACTIVO.")
-            print(f"Root: {cfg.root_dir}")
-            print(f"Filtro: videos < {cfg.min_duration_secs}s o < {args.min_size_kb} KB")
-            confirm = input("Escribe 'BORRAR' para confirmar: ").strip()
-            if confirm != "BORRAR":
-                print("Cancelado.")
-                return 2
+        if not _confirm_apply(args, cfg, f"Filtro: videos < {cfg.min_duration_secs}s o < {args.min_size_kb} KB"):
+            return 2
 
         purge_short_videos(cfg)
         return 0
 
+    if args.command == "purge-corrupt":
+        root = os.path.abspath(args.root)
+        dry_run = not bool(args.apply)
+
+        cfg = PurgeCorruptConfig(
+            root_dir=root,
+            dry_run=dry_run,
+            process_recup_prefix=args.recup_prefix,
+            **_run_kwargs(args),
+        )
+
+        if not _confirm_apply(args, cfg, "Filtro: JPEG sin EOI, PNG sin IEND, MP4 sin moov o truncado, MKV/AVI truncados"):
+            return 2
+
+        purge_corrupt(cfg)
+        return 0
+
+    if args.command == "purge-app-junk":
+        root = os.path.abspath(args.root)
+        dry_run = not bool(args.apply)
+
+        cfg = PurgeAppJunkConfig(
+            root_dir=root,
+            dry_run=dry_run,
+            process_recup_prefix=args.recup_prefix,
+            messaging_max_quality=args.messaging_max_quality,
+            **_run_kwargs(args),
+        )
+
+        if not _confirm_apply(args, cfg, f"Filtro: capturas de pantalla y JPEG de mensajería (calidad <= {cfg.messaging_max_quality}) sin EXIF de cámara"):
+            return 2
+
+        purge_app_junk(cfg)
+        return 0
+
+    if args.command == "dedupe-videos":
+        root = os.path.abspath(args.root)
+        dry_run = not bool(args.apply)
+
+        cfg = DedupeVideosConfig(
+            root_dir=root,
+            dry_run=dry_run,
+            process_recup_prefix=args.recup_prefix,
+            frames=args.frames,
+            max_distance=args.max_distance,
+            duration_tolerance_secs=args.duration_tolerance,
+            workers=args.workers,
+            **_run_kwargs(args),
+        )
+
+        if not _confirm_apply(args, cfg, f"Filtro: videos casi duplicados (distancia <= {cfg.max_distance} bits/frame)"):
+            return 2
+
+        dedupe_videos(cfg)
+        return 0
+
+    if args.command == "index-library":
+        count = build_index(
+            os.path.abspath(args.library), os.path.abspath(args.index), workers=args.workers
+        )
+        print(f"Índice creado: {os.path.abspath(args.index)} ({count} archivos)")
+        return 0
+
+    if args.command == "purge-known":
+        root = os.path.abspath(args.root)
+        dry_run = not bool(args.apply)
+
+        cfg = PurgeKnownConfig(
+            root_dir=root,
+            index_dir=os.path.abspath(args.index),
+            dry_run=dry_run,
+            process_recup_prefix=args.recup_prefix,
+            **_run_kwargs(args),
+        )
+
+        if not _confirm_apply(args, cfg, f"Filtro: archivos idénticos a los del índice {cfg.index_dir}"):
+            return 2
+
+        purge_known(cfg)
+        return 0
+
+    if args.command == "restore":
+        try:
+            restored, errors = restore_run(
+                os.path.abspath(args.quarantine), args.run_id, workers=args.workers
+            )
+        except ValueError as exc:
+            print(exc)
+            return 2
+        print(f"Restaurados: {restored} errores: {errors}")
+        return 0 if errors == 0 else 1
+
+    if args.command == "purge-quarantine":
+        quarantine_dir = os.path.abspath(args.quarantine)
+        known_runs = list_runs(quarantine_dir)
+        run_ids = args.run_ids or known_runs
+        if not run_ids:
+            print(f"No hay ejecuciones en cuarentena en: {quarantine_dir}")
+            return 0
+
+        # Validar todos antes de borrar nada: un id con '..' o mal escrito no se toca.
+        unknown = [run_id for run_id in run_ids if run_id not in known_runs]
+        if unknown:
+            for run_id in unknown:
+                print(f"No existe la ejecución '{run_id}' en la cuarentena: {quarantine_dir}")
+            return 2
+
+        if not args.yes:
+            print("ATENCIÓN: BORRADO DEFINITIVO DE LA CUARENTENA.")
+            for run_id in run_ids:
+                print(f"  {run_id}")
+            if not _ask_borrar():
+                return 2
+
+        total_errors = 0
+        for run_id in run_ids:
+            deleted, errors = purge_run(quarantine_dir, run_id, workers=args.workers)
+            total_errors += errors
+            print(f"{run_id}: borrados={deleted} errores={errors}")
+        return 0 if total_errors == 0 else 1
+
+    if args.command == "plan-shards":
+        if args.shards < 1:
+            parser.error("--shards debe ser >= 1")
+        dirs = list_recup_dirs(os.path.abspath(args.root), args.recup_prefix)
+        plan = plan_shards(dirs, args.shards)
+        write_shard_plan(os.path.abspath(args.output), plan, args.shards)
+        for shard in range(args.shards):
+            count = sum(1 for s in plan.values() if s == shard)
+            print(f"Shard {shard}/{args.shards}: {count} carpetas")
+        print(f"Plan: {os.path.abspath(args.output)}")
+        return 0
+
+    if args.command == "merge-reports":
+        merge_reports(
+            [os.path.abspath(p) for p in args.reports],
+            os.path.abspath(args.output) if args.output else None,
+        )
+        return 0
+
+    if args.command == "review-thumbs":
+        review_thumbs(
+            os.path.abspath(args.report),
+            os.path.abspath(args.output) if args.output else None,
+            cache_dir=os.path.abspath(args.cache),
+            cache_max_bytes=args.cache_max,
+            thumb_size=args.size,
+            per_page=args.per_page,
+            workers=args.workers,
+            include_keep=args.all,
+        )
+        return 0
+
     parser.print_help()
     return 1
 
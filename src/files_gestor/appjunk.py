@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import mmap
+import struct
+from dataclasses import dataclass, field
+from typing import Optional, Set
+
+
+JPEG_EXTENSIONS = frozenset({".jpg", ".jpeg"})
+CLASSIFIED_EXTENSIONS = JPEG_EXTENSIONS | {".png"}
+
+# Text that screenshot tools leave in EXIF UserComment/Software, XMP or PNG text chunks.
+_SCREENSHOT_MARKER = b"screenshot"
+
+# Tags TIFF/EXIF usados.
+_TAG_MAKE = 0x010F
+_TAG_MODEL = 0x0110
+_TAG_SOFTWARE = 0x0131
+_TAG_EXIF_IFD = 0x8769
+_TAG_USER_COMMENT = 0x9286
+
+# Tamaño en bytes de cada tipo TIFF (ASCII=2, UNDEFINED=7...).
+_TIFF_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8}
+
+# Identificadores de segmentos APPn (prefijo de sus datos).
+_APP_SIGNATURES = (
+    (b"JFIF\x00", "JFIF"),
+    (b"JFXX\x00", "JFXX"),
+    (b"Exif\x00", "Exif"),
+    (b"http://ns.adobe.com/xap/1.0/\x00", "XMP"),
+    (b"http://ns.adobe.com/xmp/extension/\x00", "XMP"),
+    (b"ICC_PROFILE\x00", "ICC_PROFILE"),
+    (b"MPF\x00", "MPF"),
+    (b"Photoshop 3.0\x00", "Photoshop"),
+    (b"Ducky", "Ducky"),
+    (b"Adobe", "Adobe"),
+)
+
+# SOFn con dimensiones; C4 (DHT), C8 (JPG) y CC (DAC) comparten rango pero no lo son.
+_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# Tabla de luminancia estándar (ITU T.81, anexo K) que los encoders escalan según la calidad.
+_STD_LUMINANCE_SUM = sum(
+    (
+        16, 11, 10, 16, 24, 40, 51, 61,
+        12, 12, 14, 19, 26, 58, 60, 55,
+        14, 13, 16, 24, 40, 57, 69, 56,
+        14, 17, 22, 29, 51, 87, 80, 62,
+        18, 22, 37, 56, 68, 109, 103, 77,
+        24, 35, 55, 64, 81, 104, 113, 92,
+        49, 64, 78, 87, 103, 121, 120, 101,
+        72, 92, 95, 98, 112, 100, 103, 99,
+    )
+)
+
+
+@dataclass
+class ImageHeader:
+    width: int = 0
+    height: int = 0
+    # Make o Model presentes en EXIF: la imagen salió de una cámara
+    camera_exif: bool = False
+    screenshot_marker: bool = False
+    # Identificadores de los segmentos APPn encontrados (solo JPEG)
+    app_signatures: Set[str] = field(default_factory=set)
+    # Calidad IJG estimada a partir de la tabla de cuantización de luminancia
+    jpeg_quality: Optional[int] = None
+
+
+def _estimate_quality(table_sum: int) -> int:
+    """Invierte el escalado IJG: scale = 5000/q (q < 50) o 200 - 2q (q >= 50)."""
+    scale = table_sum * 100 / _STD_LUMINANCE_SUM
+    if scale <= 100:
+        quality = (200 - scale) / 2
+    else:
+        quality = 5000 / scale
+    return max(1, min(100, round(quality)))
+
+
+def _parse_tiff(data: bytes, header: ImageHeader) -> None:
+    """Recorre IFD0 y el sub-IFD EXIF buscando Make/Model y marcas de captura."""
+    order = data[:2]
+    if order == b"II":
+        endian = "<"
+    elif order == b"MM":
+        endian = ">"
+    else:
+        return
+
+    def walk(ifd_offset: int, follow_exif: bool) -> None:
+        (count,) = struct.unpack_from(endian + "H", data, ifd_offset)
+        for i in range(count):
+            entry = ifd_offset + 2 + 12 * i
+            tag, typ, n = struct.unpack_from(endian + "HHI", data, entry)
+            length = n * _TIFF_TYPE_SIZES.get(typ, 1)
+            if length <= 4:
+                value_offset = entry + 8
+            else:
+                (value_offset,) = struct.unpack_from(endian + "I", data, entry + 8)
+            value = data[value_offset : value_offset + length]
+
+            if tag in (_TAG_MAKE, _TAG_MODEL) and value.strip(b"\x00 "):
+                header.camera_exif = True
+            elif tag in (_TAG_SOFTWARE, _TAG_USER_COMMENT):
+                if _SCREENSHOT_MARKER in value.lower():
+                    header.screenshot_marker = True
+            elif tag == _TAG_EXIF_IFD and follow_exif:
+                (sub_ifd,) = struct.unpack_from(endian + "I", data, entry + 8)
+                walk(sub_ifd, follow_exif=False)
+
+    (ifd0,) = struct.unpack_from(endian + "I", data, 4)
+    walk(ifd0, follow_exif=True)
+
+
+def _read_jpeg(buf: mmap.mmap, size: int) -> ImageHeader:
+    """Recorre los segmentos hasta SOS; nunca toca los datos comprimidos."""
+    header = ImageHeader()
+    offset = 2
+    while offset + 4 <= size:
+        if buf[offset] != 0xFF:
+            break
+        marker = buf[offset + 1]
+        if marker == 0xFF:
+            offset += 1
+            continue
+        if marker == 0xD8 or 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            offset += 2
+            continue
+        if marker in (0xD9, 0xDA):
+            break
+
+        (length,) = struct.unpack_from(">H", buf, offset + 2)
+        if length < 2:
+            break
+        start = offset + 4
+        end = min(offset + 2 + length, size)
+
+        if 0xE0 <= marker <= 0xEF:
+            prefix = buf[start : min(start + 40, end)]
+            for signature, name in _APP_SIGNATURES:
+                if prefix.startswith(signature):
+                    header.app_signatures.add(name)
+                    if name == "Exif":
+                        _parse_tiff(buf[start + 6 : end], header)
+                    elif name == "XMP" and _SCREENSHOT_MARKER in buf[start:end].lower():
+                        header.screenshot_marker = True
+                    break
+        elif marker == 0xDB:
+            pos = start
+            while pos < end:
+                precision, table_id = buf[pos] >> 4, buf[pos] & 0x0F
+                table_bytes = 128 if precision else 64
+                if table_id == 0 and header.jpeg_quality is None:
+                    values = buf[pos + 1 : pos + 1 + table_bytes]
+                    if precision:
+                        total = sum(struct.unpack(">64H", values))
+                    else:
+                        total = sum(values)
+                    header.jpeg_quality = _estimate_quality(total)
+                pos += 1 + table_bytes
+        elif marker in _SOF_MARKERS:
+            header.height, header.width = struct.unpack_from(">HH", buf, start + 1)
+
+        offset = offset + 2 + length
+    return header
+
+
+def _read_png(buf: mmap.mmap, size: int) -> ImageHeader:
+    """Lee IHDR y los chunks de texto/EXIF anteriores a IDAT."""
+    header = ImageHeader()
+    offset = 8
+    while offset + 8 <= size:
+        length, chunk_type = struct.unpack_from(">I4s", buf, offset)
+        start = offset + 8
+        end = min(start + length, size)
+
+        if chunk_type == b"IHDR":
+            header.width, header.height = struct.unpack_from(">II", buf, start)
+        elif chunk_type in (b"tEXt", b"iTXt", b"zTXt"):
+            if _SCREENSHOT_MARKER in buf[start:end].lower():
+                header.screenshot_marker = True
+        elif chunk_type == b"eXIf":
+            _parse_tiff(buf[start:end], header)
+        elif chunk_type in (b"IDAT", b"IEND"):
+            break
+
+        offset = start + length + 4  # + CRC
+    return header
+
+
+def read_image_header(path: str, extension: str) -> Optional[ImageHeader]:
+    """
+    Extrae dimensiones y metadatos de una imagen leyendo solo sus cabeceras vía mmap.
+
+    Devuelve None si la firma no corresponde a la extensión.
+    Lanza OSError si el archivo no se puede abrir, struct.error/IndexError si
+    las cabeceras están cortadas.
+    """
+    with open(path, "rb") as f:
+        size = f.seek(0, 2)
+        if size < 8:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if extension in JPEG_EXTENSIONS and buf[:3] == b"\xff\xd8\xff":
+                return _read_jpeg(buf, size)
+            if extension == ".png" and buf[:8] == b"\x89PNG\r\n\x1a\n":
+                return _read_png(buf, size)
+    return None
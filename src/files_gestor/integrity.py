@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import mmap
+import struct
+from typing import Callable, Dict, Optional
+
+
+# Bytes inspected at the end of a file when looking for a trailer marker.
+# Some encoders pad after EOI/IEND, so the marker is not always the last bytes.
+TAIL_WINDOW_BYTES = 64 * 1024
+
+MP4_LIKE_EXTENSIONS = frozenset({".mp4", ".mov", ".m4v", ".3gp"})
+
+# Old QuickTime files may not start with "ftyp".
+_MP4_FIRST_BOXES = frozenset({b"ftyp", b"moov", b"mdat", b"wide", b"free", b"skip", b"pnot"})
+
+
+def _has_trailer(buf: mmap.mmap, marker: bytes, start: int, size: int) -> bool:
+    """
+    Busca marker primero en la cola y, si no está, desde start hasta EOF.
+
+    Lo normal es encontrarlo en la cola; el recorrido completo solo se paga en
+    archivos sospechosos, y evita borrar uno válido con mucho relleno al final.
+    """
+    tail_start = max(size - TAIL_WINDOW_BYTES, start)
+    if buf.rfind(marker, tail_start, size) != -1:
+        return True
+    return tail_start > start and buf.rfind(marker, start, tail_start + len(marker)) != -1
+
+
+def _jpeg_scan_offset(buf: mmap.mmap, size: int) -> Optional[int]:
+    """Recorre los segmentos de cabecera y devuelve dónde empiezan los datos del primer SOS."""
+    offset = 2
+    while offset + 4 <= size:
+        if buf[offset] != 0xFF:
+            return None
+        marker = buf[offset + 1]
+        if marker == 0xFF:
+            offset += 1
+            continue
+        if marker == 0xD8 or 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            offset += 2
+            continue
+        if marker == 0xD9:
+            return None
+        (length,) = struct.unpack_from(">H", buf, offset + 2)
+        if length < 2:
+            return None
+        offset += 2 + length
+        if marker == 0xDA:
+            return offset if offset <= size else None
+    return None
+
+
+def _check_jpeg(buf: mmap.mmap, size: int) -> Optional[str]:
+    if buf[:3] != b"\xff\xd8\xff":
+        return "jpeg_bad_signature"
+    # El EOI se busca solo tras el SOS de la imagen principal: la miniatura EXIF
+    # de APP1 trae su propio FFD9 y haría pasar por buena una imagen cortada.
+    scan_offset = _jpeg_scan_offset(buf, size)
+    if scan_offset is None:
+        return "jpeg_truncated_header"
+    if not _has_trailer(buf, b"\xff\xd9", scan_offset, size):
+        return "jpeg_missing_eoi"
+    return None
+
+
+def _check_png(buf: mmap.mmap, size: int) -> Optional[str]:
+    if buf[:8] != b"\x89PNG\r\n\x1a\n":
+        return "png_bad_signature"
+    if not _has_trailer(buf, b"IEND", 8, size):
+        return "png_missing_iend"
+    return None
+
+
+def _check_riff(buf: mmap.mmap, size: int, form_type: bytes, label: str) -> Optional[str]:
+    if size < 12 or buf[:4] != b"RIFF" or buf[8:12] != form_type:
+        return f"{label}_bad_signature"
+    (riff_size,) = struct.unpack_from("<I", buf, 4)
+    if riff_size + 8 > size:
+        return f"{label}_truncated"
+    return None
+
+
+def _check_avi(buf: mmap.mmap, size: int) -> Optional[str]:
+    return _check_riff(buf, size, b"AVI ", "avi")
+
+
+def _check_webp(buf: mmap.mmap, size: int) -> Optional[str]:
+    return _check_riff(buf, size, b"WEBP", "webp")
+
+
+def _is_box_type(box_type: bytes) -> bool:
+    """Los tipos de caja de primer nivel son 4 caracteres ASCII imprimibles."""
+    return all(0x20 <= b < 0x7F for b in box_type)
+
+
+def _check_mp4(buf: mmap.mmap, size: int) -> Optional[str]:
+    """Recorre solo las cabeceras de las cajas de primer nivel (ISO BMFF)."""
+    if size < 8 or buf[4:8] not in _MP4_FIRST_BOXES:
+        return "mp4_bad_signature"
+
+    offset = 0
+    has_moov = False
+    while offset + 8 <= size:
+        box_size, box_type = struct.unpack_from(">I4s", buf, offset)
+        if has_moov and not _is_box_type(box_type):
+            # Cadena de cajas completa con moov y después basura (relleno de la
+            # recuperación, bytes añadidos): el video se reproduce, no se borra.
+            return None
+        header = 8
+        if box_size == 1:
+            if offset + 16 > size:
+                return "mp4_truncated_box"
+            (box_size,) = struct.unpack_from(">Q", buf, offset + 8)
+            header = 16
+        elif box_size == 0:
+            box_size = size - offset
+
+        if box_size < header:
+            return "mp4_bad_box"
+        if box_type == b"moov":
+            has_moov = True
+        if offset + box_size > size:
+            return "mp4_truncated_box"
+        offset += box_size
+
+    if not has_moov:
+        return "mp4_missing_moov"
+    return None
+
+
+def _read_ebml_vint(buf: mmap.mmap, offset: int, size: int) -> Optional[tuple[int, int, bool]]:
+    """Lee un entero EBML de longitud variable: (valor, longitud, es_desconocido)."""
+    if offset >= size:
+        return None
+    first = buf[offset]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not (first & mask):
+        mask >>= 1
+        length += 1
+    if length > 8 or offset + length > size:
+        return None
+
+    value = first & (mask - 1)
+    for b in buf[offset + 1 : offset + length]:
+        value = (value << 8) | b
+    unknown = value == (1 << (7 * length)) - 1
+    return value, length, unknown
+
+
+def _check_mkv(buf: mmap.mmap, size: int) -> Optional[str]:
+    if buf[:4] != b"\x1a\x45\xdf\xa3":
+        return "mkv_bad_signature"
+
+    header_size = _read_ebml_vint(buf, 4, size)
+    if header_size is None:
+        return "mkv_truncated"
+    value, length, _unknown = header_size
+    offset = 4 + length + value
+
+    if buf[offset : offset + 4] != b"\x18\x53\x80\x67":
+        return "mkv_missing_segment"
+    segment_size = _read_ebml_vint(buf, offset + 4, size)
+    if segment_size is None:
+        return "mkv_truncated"
+    value, length, unknown = segment_size
+    if not unknown and offset + 4 + length + value > size:
+        return "mkv_truncated"
+    return None
+
+
+_CHECKS: Dict[str, Callable[[mmap.mmap, int], Optional[str]]] = {
+    ".jpg": _check_jpeg,
+    ".jpeg": _check_jpeg,
+    ".png": _check_png,
+    ".webp": _check_webp,
+    ".avi": _check_avi,
+    ".mkv": _check_mkv,
+    **{ext: _check_mp4 for ext in MP4_LIKE_EXTENSIONS},
+}
+
+CHECKED_EXTENSIONS = frozenset(_CHECKS)
+
+
+def check_integrity(path: str, extension: str) -> Optional[str]:
+    """
+    Verifica la estructura de un archivo leyendo solo cabecera y cola vía mmap.
+
+    Devuelve el motivo del fallo, o None si la estructura es coherente.
+    Lanza OSError si el archivo no se puede abrir.
+    """
+    check = _CHECKS.get(extension)
+    if check is None:
+        return None
+
+    with open(path, "rb") as f:
+        size = f.seek(0, 2)
+        if size == 0:
+            return "empty_file"
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            try:
+                return check(buf, size)
+            except (struct.error, IndexError):
+                return "unparseable_header"
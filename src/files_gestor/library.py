@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from .scan import FileEntry, iter_files_in_dir
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+DEFAULT_INDEX_DIR = os.path.join(os.path.expanduser("~"), ".cache", "files_gestor", "library_index")
+
+# Bytes leídos al inicio y al final de cada archivo para el hash parcial.
+PARTIAL_CHUNK_BYTES = 64 * 1024
+FULL_READ_BYTES = 1024 * 1024
+
+_META_FILENAME = "meta.json"
+
+
+def partial_hash(path: str, size_bytes: int) -> int:
+    """blake2b de 8 bytes sobre tamaño + primeros y últimos PARTIAL_CHUNK_BYTES."""
+    h = hashlib.blake2b(struct.pack("<Q", size_bytes), digest_size=8)
+    with open(path, "rb") as f:
+        h.update(f.read(PARTIAL_CHUNK_BYTES))
+        if size_bytes > 2 * PARTIAL_CHUNK_BYTES:
+            f.seek(-PARTIAL_CHUNK_BYTES, os.SEEK_END)
+            h.update(f.read(PARTIAL_CHUNK_BYTES))
+        elif size_bytes > PARTIAL_CHUNK_BYTES:
+            h.update(f.read())
+    return int.from_bytes(h.digest(), "little")
+
+
+def full_hash(path: str) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(FULL_READ_BYTES)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.digest()
+
+
+class BloomFilter:
+    """Bloom filter sobre claves (tamaño, hash parcial), con doble hashing."""
+
+    def __init__(self, bits: np.ndarray, num_hashes: int) -> None:
+        self.bits = bits
+        self.num_hashes = num_hashes
+        self._num_bits = int(bits.shape[0]) * 8
+
+    @classmethod
+    def for_capacity(cls, capacity: int, fp_rate: float = 0.01) -> "BloomFilter":
+        import numpy as np
+
+        capacity = max(capacity, 1)
+        num_bits = max(64, int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        return cls(np.zeros((num_bits + 7) // 8, dtype=np.uint8), num_hashes)
+
+    def _positions(self, size_bytes: int, partial: int) -> list[int]:
+        digest = hashlib.blake2b(struct.pack("<QQ", size_bytes, partial), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self._num_bits for i in range(self.num_hashes)]
+
+    def add(self, size_bytes: int, partial: int) -> None:
+        for pos in self._positions(size_bytes, partial):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def might_contain(self, size_bytes: int, partial: int) -> bool:
+        return all(
+            self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(size_bytes, partial)
+        )
+
+
+class LibraryIndex:
+    """
+    Índice persistente de una biblioteca de referencia.
+
+    sizes/partials/fulls están ordenados por (tamaño, hash parcial). sizes y el
+    Bloom filter se cargan en memoria; partials y fulls se mapean (mmap) y solo
+    se tocan tras un acierto del Bloom filter.
+    """
+
+    def __init__(
+        self,
+        sizes: np.ndarray,
+        partials: np.ndarray,
+        fulls: np.ndarray,
+        bloom: BloomFilter,
+    ) -> None:
+        self.sizes = sizes
+        self.partials = partials
+        self.fulls = fulls
+        self.bloom = bloom
+
+    def __len__(self) -> int:
+        return int(self.sizes.shape[0])
+
+    def _size_range(self, size_bytes: int) -> Tuple[int, int]:
+        lo = int(self.sizes.searchsorted(size_bytes, side="left"))
+        hi = int(self.sizes.searchsorted(size_bytes, side="right"))
+        return lo, hi
+
+    def has_size(self, size_bytes: int) -> bool:
+        lo, hi = self._size_range(size_bytes)
+        return hi > lo
+
+    def match(self, path: str, size_bytes: int) -> Tuple[bool, str]:
+        """
+        Compara un archivo con el índice: tamaño, hash parcial + Bloom, hash completo.
+
+        Devuelve (está_en_biblioteca, etapa_que_decidió).
+        """
+        lo, hi = self._size_range(size_bytes)
+        if hi == lo:
+            return False, "not_in_library_size"
+
+        partial = partial_hash(path, size_bytes)
+        if not self.bloom.might_contain(size_bytes, partial):
+            return False, "not_in_library_bloom"
+
+        candidates = [i for i in range(lo, hi) if int(self.partials[i]) == partial]
+        if not candidates:
+            return False, "not_in_library_partial"
+
+        digest = full_hash(path)
+        for i in candidates:
+            if bytes(self.fulls[i]) == digest:
+                return True, "already_in_library"
+        return False, "not_in_library_full"
+
+
+def build_index(library_root: str, index_dir: str, workers: int = 8) -> int:
+    """Hashea library_root y guarda el índice en index_dir. Devuelve nº de archivos."""
+    import numpy as np
+
+    entries = [entry for entry in iter_files_in_dir(library_root) if entry.size_bytes > 0]
+    print(f"Archivos en biblioteca: {len(entries)}")
+
+    def _hash(entry: FileEntry) -> Optional[Tuple[int, int, bytes]]:
+        try:
+            partial = partial_hash(entry.path, entry.size_bytes)
+            return entry.size_bytes, partial, full_hash(entry.path)
+        except OSError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        records = [r for r in pool.map(_hash, entries) if r is not None]
+
+    sizes = np.array([r[0] for r in records], dtype=np.uint64)
+    partials = np.array([r[1] for r in records], dtype=np.uint64)
+    fulls = np.frombuffer(b"".join(r[2] for r in records), dtype=np.uint8).reshape(-1, 16)
+
+    order = np.lexsort((partials, sizes))
+    sizes, partials, fulls = sizes[order], partials[order], fulls[order]
+
+    bloom = BloomFilter.for_capacity(len(records))
+    for size_bytes, partial in zip(sizes.tolist(), partials.tolist()):
+        bloom.add(size_bytes, partial)
+
+    os.makedirs(index_dir, exist_ok=True)
+    np.save(os.path.join(index_dir, "sizes.npy"), sizes)
+    np.save(os.path.join(index_dir, "partials.npy"), partials)
+    np.save(os.path.join(index_dir, "fulls.npy"), fulls)
+    np.save(os.path.join(index_dir, "bloom.npy"), bloom.bits)
+    with open(os.path.join(index_dir, _META_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "library_root": library_root,
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "count": len(records),
+                "bloom_hashes": bloom.num_hashes,
+            },
+            f,
+            indent=2,
+        )
+    return len(records)
+
+
+def load_index(index_dir: str) -> LibraryIndex:
+    import numpy as np
+
+    meta_path = os.path.join(index_dir, _META_FILENAME)
+    if not os.path.isfile(meta_path):
+        raise FileNotFoundError(
+            f"No hay índice en: {index_dir}. Créalo antes con 'index-library'."
+        )
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+
+    return LibraryIndex(
+        sizes=np.load(os.path.join(index_dir, "sizes.npy")),
+        partials=np.load(os.path.join(index_dir, "partials.npy"), mmap_mode="r"),
+        fulls=np.load(os.path.join(index_dir, "fulls.npy"), mmap_mode="r"),
+        bloom=BloomFilter(np.load(os.path.join(index_dir, "bloom.npy")), meta["bloom_hashes"]),
+    )
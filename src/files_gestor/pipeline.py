@@ -0,0 +1,486 @@
+from __future__ import annotations
+
+import asyncio
+import csv
+import heapq
+import itertools
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import (
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from .quarantine import QuarantineRun
+from .report import csv_row
+from .scan import FileEntry, iter_files_in_dir
+from .tuning import AutoTuner
+
+T = TypeVar("T")
+
+Decision = Tuple[bool, str]
+Log = Callable[[str], None]
+
+
+def silent(_message: str) -> None:
+    pass
+
+
+def locked(log: Log) -> Log:
+    """
+    Serializa log entre threads. print escribe mensaje y salto de línea por
+    separado, así que sin lock las líneas de productor y sink se mezclan.
+    """
+    lock = threading.Lock()
+
+    def _log(message: str) -> None:
+        with lock:
+            log(message)
+
+    return _log
+
+
+@dataclass
+class PurgeStats:
+    scanned_files: int = 0
+    deleted_files: int = 0
+    kept_files: int = 0
+    errors: int = 0
+
+    deleted_bytes: int = 0
+    kept_bytes: int = 0
+
+
+@dataclass(frozen=True)
+class DecisionRecord:
+    recup_dir: str
+    entry: FileEntry
+    should_delete: bool
+    reason: str
+    # Resultado del borrado real; None si no se intentó (keep o dry-run)
+    removed: Optional[bool] = None
+
+
+@dataclass(frozen=True)
+class DirDone:
+    """Marca del productor: ya salieron todos los registros de recup_dir."""
+
+    recup_dir: str
+
+
+# Lo que circula del productor al sink
+DecisionEvent = Union[DecisionRecord, DirDone]
+
+# Borrados pendientes que se aplican juntos (pool "unlink"), sin esperar al fin
+# de carpeta: en modo objetivo los registros no llegan agrupados por carpeta.
+DELETE_BATCH_SIZE = 256
+DELETE_BATCH_SECS = 2.0
+
+
+@dataclass(frozen=True)
+class Rule:
+    """Qué archivos evalúa una regla y cómo decide sobre ellos."""
+
+    selects: Callable[[FileEntry], bool]
+    # Decisión con solo el stat; None si hace falta abrir el archivo
+    decide_cheap: Callable[[FileEntry], Optional[Decision]]
+    # Decisión completa (Pillow, ffprobe, lectura de cabeceras...)
+    decide: Callable[[FileEntry], Decision]
+    # Tipo de trabajo de decide, para la concurrencia inicial (ver tuning.py)
+    probe_kind: str = "read"
+
+
+# ── Producción de decisiones ───────────────────────────────────────
+
+
+def _scan_dir(recup_dir: str) -> Tuple[str, List[FileEntry]]:
+    return recup_dir, list(iter_files_in_dir(recup_dir))
+
+
+def iter_rule_decisions(
+    rule: Rule,
+    recup_dirs: Sequence[str],
+    *,
+    device_path: str,
+    reclaim_target_bytes: Optional[int] = None,
+    log: Log = silent,
+) -> Iterator[DecisionEvent]:
+    """
+    Genera una decisión por archivo seleccionado, sin efectos secundarios.
+
+    Las carpetas se escanean por delante (pool "stat") y las decisiones costosas
+    se prueban en paralelo (pool rule.probe_kind); ambos pools se autoajustan.
+    Los registros de una carpeta salen juntos, seguidos de su DirDone. Con
+    objetivo de espacio salen por tamaño, mezclando carpetas y sin DirDone.
+    """
+    if reclaim_target_bytes is not None:
+        yield from _iter_reclaim_decisions(rule, recup_dirs, reclaim_target_bytes, log)
+        return
+
+    stat_tuner = AutoTuner.for_path("stat", device_path, log=log)
+    probe_tuner = AutoTuner.for_path(rule.probe_kind, device_path, log=log)
+    with stat_tuner, probe_tuner:
+        for recup_dir, entries in stat_tuner.map_unordered(_scan_dir, recup_dirs):
+            cheap: List[Tuple[FileEntry, Decision]] = []
+            to_probe: List[FileEntry] = []
+            for entry in entries:
+                if not rule.selects(entry):
+                    continue
+                decision = rule.decide_cheap(entry)
+                if decision is None:
+                    to_probe.append(entry)
+                else:
+                    cheap.append((entry, decision))
+
+            probed = probe_tuner.map_unordered(lambda entry: (entry, rule.decide(entry)), to_probe)
+            for entry, (should_delete, reason) in itertools.chain(cheap, probed):
+                yield DecisionRecord(recup_dir, entry, should_delete, reason)
+            yield DirDone(recup_dir)
+
+
+def _iter_reclaim_decisions(
+    rule: Rule,
+    recup_dirs: Sequence[str],
+    target: int,
+    log: Log,
+) -> Iterator[DecisionRecord]:
+    """
+    Decide primero sobre los candidatos más grandes y para al alcanzar el objetivo.
+
+    Un primer pase solo con stat descarta lo que la regla barata ya conserva; el
+    resto entra en un heap por tamaño y solo se prueba (Pillow/ffprobe) lo que se
+    saca de él antes de llegar al objetivo. El objetivo se mide en bytes con
+    decisión de borrar, antes de que el borrado se aplique.
+    """
+    heap: List[Tuple[int, str, str, FileEntry, Optional[Decision]]] = []
+    for recup_dir in recup_dirs:
+        for entry in iter_files_in_dir(recup_dir):
+            if not rule.selects(entry):
+                continue
+            decision = rule.decide_cheap(entry)
+            if decision is not None and not decision[0]:
+                continue
+            heap.append((-entry.size_bytes, entry.path, recup_dir, entry, decision))
+
+    heapq.heapify(heap)
+    log(f"Objetivo: liberar {target} bytes; candidatos: {len(heap)}")
+
+    reclaimed = 0
+    while heap and reclaimed < target:
+        _neg_size, _path, recup_dir, entry, decision = heapq.heappop(heap)
+        if decision is None:
+            decision = rule.decide(entry)
+
+        should_delete, reason = decision
+        if should_delete:
+            reclaimed += entry.size_bytes
+        yield DecisionRecord(recup_dir, entry, should_delete, reason)
+
+    if reclaimed >= target:
+        log(f"Objetivo alcanzado; {len(heap)} candidatos sin evaluar.")
+    else:
+        log(f"Objetivo NO alcanzado: {reclaimed} bytes marcados para borrar.")
+
+
+class _Failure:
+    def __init__(self, exc: BaseException) -> None:
+        self.exc = exc
+
+
+async def aiter_in_thread(
+    make_iter: Callable[[], Iterator[T]], maxsize: int = 256
+) -> AsyncIterator[T]:
+    """
+    Expone un iterador bloqueante como async iterator.
+
+    El iterador corre en un thread propio y deja como mucho `maxsize` elementos
+    en cola: si el consumidor async va lento, el productor se detiene (backpressure).
+    """
+    loop = asyncio.get_running_loop()
+    items: asyncio.Queue = asyncio.Queue(maxsize=max(maxsize, 1))
+    done = object()
+    stop = threading.Event()
+
+    def _put(item: object) -> None:
+        asyncio.run_coroutine_threadsafe(items.put(item), loop).result()
+
+    def _produce() -> None:
+        it: Optional[Iterator[T]] = None
+        try:
+            # Dentro del try: un fallo de preparación (sin carpetas, sin ffprobe,
+            # sin índice...) también tiene que llegar al consumidor.
+            it = make_iter()
+            for item in it:
+                if stop.is_set():
+                    return
+                _put(item)
+            _put(done)
+        except BaseException as exc:  # se re-lanza en el consumidor
+            if not stop.is_set():
+                _put(_Failure(exc))
+        finally:
+            close = getattr(it, "close", None)
+            if close is not None:
+                close()
+
+    producer = threading.Thread(target=_produce, name="decision-producer", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = await items.get()
+            if item is done:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
+        # Libera al productor si estaba bloqueado con la cola llena.
+        while not items.empty():
+            items.get_nowait()
+
+
+# ── Consumo de decisiones ──────────────────────────────────────────
+
+
+class DecisionConsumer:
+    """
+    Efecto secundario sobre decisiones ya aplicadas (reporte, stats, progreso...).
+
+    apply_decisions llama a todos los consumidores desde un único thread, así que
+    no necesitan sincronización propia.
+    """
+
+    def on_record(self, record: DecisionRecord) -> None:
+        pass
+
+    def on_dir_done(self, recup_dir: str) -> None:
+        """Tras el último registro de la carpeta; solo si el productor emite DirDone."""
+
+    def close(self) -> None:
+        pass
+
+
+class StatsConsumer(DecisionConsumer):
+    def __init__(self) -> None:
+        self.total = PurgeStats()
+        self.by_dir: Dict[str, PurgeStats] = {}
+
+    def on_record(self, record: DecisionRecord) -> None:
+        size_bytes = record.entry.size_bytes
+        for stats in (self.total, self.by_dir.setdefault(record.recup_dir, PurgeStats())):
+            stats.scanned_files += 1
+            if not record.should_delete:
+                stats.kept_files += 1
+                stats.kept_bytes += size_bytes
+            elif record.removed is False:
+                stats.errors += 1
+            else:
+                stats.deleted_files += 1
+                stats.deleted_bytes += size_bytes
+
+
+class CsvReportConsumer(DecisionConsumer):
+    """Añade una fila por decisión a un reporte cuya cabecera ya está escrita."""
+
+    def __init__(self, report_csv: str, dry_run: bool) -> None:
+        self.dry_run = dry_run
+        self._file = open(report_csv, "a", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+
+    def on_record(self, record: DecisionRecord) -> None:
+        self._writer.writerow(
+            csv_row(
+                action="delete" if record.should_delete else "keep",
+                dry_run=self.dry_run,
+                reason=record.reason,
+                extension=record.entry.extension,
+                size_bytes=record.entry.size_bytes,
+                file_path=record.entry.path,
+            )
+        )
+
+    def on_dir_done(self, recup_dir: str) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def print_summary(stats_dir: PurgeStats, log: Log = print) -> None:
+    log(
+        "Resumen carpeta: "
+        f"scanned={stats_dir.scanned_files} "
+        f"delete={stats_dir.deleted_files} "
+        f"keep={stats_dir.kept_files} "
+        f"errors={stats_dir.errors}"
+    )
+
+
+class ProgressConsumer(DecisionConsumer):
+    """
+    Imprime cada carpeta con su primer registro y su resumen con DirDone.
+
+    En modo objetivo no hay DirDone: cada carpeta se anuncia una vez y el
+    resumen queda solo en el total.
+    """
+
+    def __init__(self, stats: StatsConsumer, log: Log = print) -> None:
+        self.stats = stats
+        self._log = log
+        self._started: Set[str] = set()
+
+    def on_record(self, record: DecisionRecord) -> None:
+        if record.recup_dir not in self._started:
+            self._started.add(record.recup_dir)
+            self._log(f"--- Procesando: {record.recup_dir} ---")
+
+    def on_dir_done(self, recup_dir: str) -> None:
+        # Sin registros (carpeta vacía o sin archivos de la regla) no se anunció
+        if recup_dir in self._started:
+            self._started.discard(recup_dir)
+            print_summary(self.stats.by_dir.get(recup_dir, PurgeStats()), self._log)
+
+
+def remove_entry(entry: FileEntry, quarantine: Optional[QuarantineRun] = None) -> bool:
+    """Borra (o mueve a cuarentena) un archivo. Devuelve False si falla."""
+    try:
+        if quarantine is not None:
+            quarantine.move(entry.path, entry.size_bytes)
+        else:
+            os.remove(entry.path)
+        return True
+    except OSError:
+        return False
+
+
+def _sink(
+    get: Callable[[], object],
+    end: object,
+    consumers: Sequence[DecisionConsumer],
+    dry_run: bool,
+    quarantine: Optional[QuarantineRun],
+    device_path: str,
+    log: Log,
+) -> None:
+    """
+    Aplica borrados (pool "unlink") en lotes y pasa los registros a los consumidores.
+
+    Un lote se aplica al llegar a DELETE_BATCH_SIZE, al pasar DELETE_BATCH_SECS
+    desde su primer borrado, con cada DirDone (antes de on_dir_done, para que el
+    resumen de la carpeta esté completo) y al final.
+    """
+
+    def emit(record: DecisionRecord) -> None:
+        for consumer in consumers:
+            consumer.on_record(record)
+
+    def remove(record: DecisionRecord) -> DecisionRecord:
+        return replace(record, removed=remove_entry(record.entry, quarantine))
+
+    with AutoTuner.for_path("unlink", device_path, log=log) as unlink_tuner:
+        to_delete: List[DecisionRecord] = []
+        batch_started = 0.0
+
+        def flush() -> None:
+            for record in unlink_tuner.map_unordered(remove, to_delete):
+                emit(record)
+            if quarantine is not None and to_delete:
+                quarantine.flush()
+            to_delete.clear()
+
+        while True:
+            item = get()
+            if item is end:
+                break
+
+            if isinstance(item, DirDone):
+                flush()
+                for consumer in consumers:
+                    consumer.on_dir_done(item.recup_dir)
+                continue
+
+            record: DecisionRecord = item  # type: ignore[assignment]
+            if record.should_delete and not dry_run:
+                if not to_delete:
+                    batch_started = time.monotonic()
+                to_delete.append(record)
+            else:
+                emit(record)
+
+            if to_delete and (
+                len(to_delete) >= DELETE_BATCH_SIZE
+                or time.monotonic() - batch_started >= DELETE_BATCH_SECS
+            ):
+                flush()
+
+        flush()
+
+
+def apply_decisions(
+    decisions: Iterable[DecisionEvent],
+    consumers: Sequence[DecisionConsumer],
+    *,
+    dry_run: bool = True,
+    quarantine: Optional[QuarantineRun] = None,
+    device_path: str = ".",
+    queue_size: int = 1024,
+    log: Log = silent,
+) -> None:
+    """
+    Consume las decisiones: borra (si no es dry-run) y alimenta a los consumidores.
+
+    La producción (escaneo y pruebas) corre en el thread que llama; borrados,
+    CSV y salida por pantalla corren en otro, detrás de una cola acotada, así que
+    el escaneo no espera a stdout ni a escrituras salvo si la cola se llena.
+    Cada DirDone de `decisions` se pasa a on_dir_done. Al terminar se cierran
+    todos los consumidores.
+    """
+    records: "queue.Queue[object]" = queue.Queue(maxsize=max(queue_size, 1))
+    end = object()
+    ended = threading.Event()
+    failures: List[BaseException] = []
+
+    def get() -> object:
+        item = records.get()
+        if item is end:
+            ended.set()
+        return item
+
+    def run_sink() -> None:
+        try:
+            _sink(get, end, consumers, dry_run, quarantine, device_path, log)
+        except BaseException as exc:
+            failures.append(exc)
+            # Seguir vaciando la cola para no bloquear al productor.
+            while not ended.is_set():
+                get()
+
+    sink = threading.Thread(target=run_sink, name="decision-sink", daemon=True)
+    sink.start()
+    try:
+        for record in decisions:
+            if failures:
+                break
+            records.put(record)
+    finally:
+        records.put(end)
+        sink.join()
+        for consumer in consumers:
+            consumer.close()
+
+    if failures:
+        raise failures[0]
@@ -1,110 +1,153 @@
 from __future__ import annotations
 
+import itertools
 import json
 import os
+import re
 import shutil
+import struct
 import subprocess
-from dataclasses import dataclass
-from typing import Dict, Optional, Tuple
-
-from .report import append_csv_row, ensure_reports_dir, write_csv_header
+from dataclasses import asdict, fields
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .appjunk import CLASSIFIED_EXTENSIONS, ImageHeader, read_image_header
+from .integrity import CHECKED_EXTENSIONS, check_integrity
+from .library import load_index
+from .pipeline import (
+    CsvReportConsumer,
+    Decision,
+    DecisionConsumer,
+    DecisionEvent,
+    DecisionRecord,
+    DirDone,
+    Log,
+    ProgressConsumer,
+    PurgeStats,
+    Rule,
+    StatsConsumer,
+    aiter_in_thread,
+    apply_decisions,
+    iter_rule_decisions,
+    locked,
+    silent,
+)
+from .quarantine import QuarantineRun
+from .report import (
+    ReportPaths,
+    ensure_reports_dir,
+    iter_csv_rows,
+    read_stats_json,
+    write_csv_header,
+    write_csv_rows,
+    write_stats_json,
+)
 from .rules import (
     IMAGE_EXTENSIONS,
     VIDEO_EXTENSIONS,
+    DedupeVideosConfig,
+    PurgeAppJunkConfig,
     PurgeByTypeConfig,
+    PurgeCorruptConfig,
+    PurgeKnownConfig,
     PurgeShortVideosConfig,
     PurgeSmallImagesConfig,
 )
-from .scan import FileEntry, iter_files_in_dir, list_recup_dirs
-
-
-@dataclass
-class PurgeStats:
-    scanned_files: int = 0
-    deleted_files: int = 0
-    kept_files: int = 0
-    errors: int = 0
-
-    deleted_bytes: int = 0
-    kept_bytes: int = 0
-
-
-def _apply_decision(
-    *,
-    entry: FileEntry,
-    should_delete: bool,
-    reason: str,
-    dry_run: bool,
-    report_csv: str,
-    stats_total: PurgeStats,
-    stats_dir: PurgeStats,
-) -> None:
-    """Aplica la decisión de borrar o conservar, actualiza stats y CSV."""
-    if should_delete:
-        append_csv_row(
-            report_csv,
-            action="delete",
-            dry_run=dry_run,
-            reason=reason,
-            extension=entry.extension,
-            size_bytes=entry.size_bytes,
-            file_path=entry.path,
-        )
-
-        if dry_run:
-            stats_total.deleted_files += 1
-            stats_dir.deleted_files += 1
-            stats_total.deleted_bytes += entry.size_bytes
-            stats_dir.deleted_bytes += entry.size_bytes
-            return
-
-        try:
-            os.remove(entry.path)
-            stats_total.deleted_files += 1
-            stats_dir.deleted_files += 1
-            stats_total.deleted_bytes += entry.size_bytes
-            stats_dir.deleted_bytes += entry.size_bytes
-        except OSError:
-            stats_total.errors += 1
-            stats_dir.errors += 1
-        return
+from .scan import (
+    FileEntry,
+    iter_files_in_dir,
+    list_recup_dirs,
+    read_shard_plan,
+    shard_recup_dirs,
+)
+from .tuning import AutoTuner
+from .videodup import extract_frame_hashes, group_near_duplicates, is_hashable, pick_keeper
 
-    # kept
-    append_csv_row(
-        report_csv,
-        action="keep",
-        dry_run=dry_run,
-        reason=reason,
-        extension=entry.extension,
-        size_bytes=entry.size_bytes,
-        file_path=entry.path,
-    )
-    stats_total.kept_files += 1
-    stats_dir.kept_files += 1
-    stats_total.kept_bytes += entry.size_bytes
-    stats_dir.kept_bytes += entry.size_bytes
-
-
-def _print_summary(stats_dir: PurgeStats, stats_total: PurgeStats, report_csv: str) -> None:
-    print(
-        "Resumen carpeta: "
-        f"scanned={stats_dir.scanned_files} "
-        f"delete={stats_dir.deleted_files} "
-        f"keep={stats_dir.kept_files} "
-        f"errors={stats_dir.errors}"
-    )
+PurgeConfig = Union[
+    DedupeVideosConfig,
+    PurgeAppJunkConfig,
+    PurgeByTypeConfig,
+    PurgeCorruptConfig,
+    PurgeKnownConfig,
+    PurgeShortVideosConfig,
+    PurgeSmallImagesConfig,
+]
 
 
-def _print_total(stats_total: PurgeStats, report_csv: str) -> None:
-    print("-" * 40)
-    print(
+def _print_total(stats_total: PurgeStats, report_csv: str, log: Log = print) -> None:
+    log("-" * 40)
+    log(
         "Resumen TOTAL: "
         f"scanned={stats_total.scanned_files} "
         f"delete={stats_total.deleted_files} "
         f"keep={stats_total.kept_files} "
         f"errors={stats_total.errors}"
     )
-    print(f"Reporte CSV: {report_csv}")
+    log(f"Reporte CSV: {report_csv}")
+
+
+def _list_target_dirs(cfg: PurgeConfig, log: Log = silent) -> List[str]:
+    """Carpetas recup_dir* a procesar: sin las excluidas y filtradas por shard."""
+    recup_dirs = list_recup_dirs(cfg.root_dir, cfg.process_recup_prefix)
+    if not recup_dirs:
+        raise FileNotFoundError(
+            f"No se encontraron carpetas '{cfg.process_recup_prefix}*' dentro de: {cfg.root_dir}"
+        )
+
+    recup_dirs = [d for d in recup_dirs if os.path.basename(d) not in cfg.exclude_dirnames]
+    if cfg.shard_count > 1:
+        plan = None
+        if cfg.shard_plan is not None:
+            plan_count, plan = read_shard_plan(cfg.shard_plan)
+            if plan_count != cfg.shard_count:
+                raise ValueError(
+                    f"El plan {cfg.shard_plan} es para {plan_count} shards, no {cfg.shard_count}"
+                )
+        recup_dirs = shard_recup_dirs(recup_dirs, cfg.shard_index, cfg.shard_count, plan)
+        log(
+            f"Shard {cfg.shard_index}/{cfg.shard_count} "
+            f"({'plan' if plan is not None else 'hash'}): {len(recup_dirs)} carpetas"
+        )
+    return recup_dirs
+
+
+# Prefijo del reporte (y del id de cuarentena) de cada regla
+_REPORT_PREFIXES: Dict[type, str] = {
+    PurgeByTypeConfig: "purge_by_type",
+    PurgeSmallImagesConfig: "purge_small_images",
+    PurgeShortVideosConfig: "purge_short_videos",
+    PurgeCorruptConfig: "purge_corrupt",
+    PurgeAppJunkConfig: "purge_app_junk",
+    PurgeKnownConfig: "purge_known",
+    DedupeVideosConfig: "dedupe_videos",
+}
+
+
+def _start_report(cfg: PurgeConfig) -> ReportPaths:
+    suffix = f"_shard{cfg.shard_index}of{cfg.shard_count}" if cfg.shard_count > 1 else ""
+    report_paths = ensure_reports_dir(
+        cfg.root_dir, cfg.reports_dirname, suffix=suffix, prefix=_REPORT_PREFIXES[type(cfg)]
+    )
+    write_csv_header(report_paths.report_csv_path)
+    return report_paths
+
+
+def _finish_run(stats_total: PurgeStats, report_csv: str, log: Log = print) -> None:
+    _print_total(stats_total, report_csv, log)
+    write_stats_json(report_csv, asdict(stats_total))
+
+
+def _open_quarantine(
+    cfg: PurgeConfig, report_csv: str, log: Log = print
+) -> Optional[QuarantineRun]:
+    """Crea la ejecución de cuarentena (mismo id que el reporte) si aplica."""
+    if cfg.dry_run or cfg.quarantine_dir is None:
+        return None
+
+    run_id = os.path.splitext(os.path.basename(report_csv))[0]
+    quarantine = QuarantineRun(cfg.quarantine_dir, cfg.root_dir, run_id=run_id)
+    log(f"Cuarentena: {quarantine.run_dir}")
+    return quarantine
 
 
 # ── Purge by type ──────────────────────────────────────────────────
@@ -122,44 +165,15 @@ def _should_delete_by_type(cfg: PurgeByTypeConfig, ext: str, size_bytes: int) ->
     return True, "extension_not_allowed"
 
 
-def purge_by_type(cfg: PurgeByTypeConfig) -> str:
-    report_paths = ensure_reports_dir(cfg.root_dir, cfg.reports_dirname)
-    write_csv_header(report_paths.report_csv_path)
+def _by_type_rule(cfg: PurgeByTypeConfig, log: Log) -> Rule:
+    def decide(entry: FileEntry) -> Decision:
+        return _should_delete_by_type(cfg, entry.extension, entry.size_bytes)
 
-    recup_dirs = list_recup_dirs(cfg.root_dir, cfg.process_recup_prefix)
-    if not recup_dirs:
-        raise FileNotFoundError(
-            f"No se encontraron carpetas '{cfg.process_recup_prefix}*' dentro de: {cfg.root_dir}"
-        )
-
-    stats_total = PurgeStats()
-
-    for recup_dir in recup_dirs:
-        if os.path.basename(recup_dir) in cfg.exclude_dirnames:
-            continue
-
-        print(f"--- Procesando: {recup_dir} ---")
-        stats_dir = PurgeStats()
+    return Rule(selects=lambda entry: True, decide_cheap=decide, decide=decide)
 
-        for entry in iter_files_in_dir(recup_dir):
-            stats_total.scanned_files += 1
-            stats_dir.scanned_files += 1
 
-            should_delete, reason = _should_delete_by_type(cfg, entry.extension, entry.size_bytes)
-            _apply_decision(
-                entry=entry,
-                should_delete=should_delete,
-                reason=reason,
-                dry_run=cfg.dry_run,
-                report_csv=report_paths.report_csv_path,
-                stats_total=stats_total,
-                stats_dir=stats_dir,
-            )
-
-        _print_summary(stats_dir, stats_total, report_paths.report_csv_path)
-
-    _print_total(stats_total, report_paths.report_csv_path)
-    return report_paths.report_csv_path
+def purge_by_type(cfg: PurgeByTypeConfig) -> str:
+    return run_purge(cfg)
 
 
 # ── Purge small images ──────────────────────────────────────────────
@@ -178,64 +192,27 @@ def _should_delete_by_dimensions(
     return False, "dimensions_ok"
 
 
-def purge_small_images(cfg: PurgeSmallImagesConfig) -> str:
+def _small_images_rule(cfg: PurgeSmallImagesConfig, log: Log) -> Rule:
     from PIL import Image
 
-    report_paths = ensure_reports_dir(cfg.root_dir, cfg.reports_dirname)
-    write_csv_header(report_paths.report_csv_path)
-
-    recup_dirs = list_recup_dirs(cfg.root_dir, cfg.process_recup_prefix)
-    if not recup_dirs:
-        raise FileNotFoundError(
-            f"No se encontraron carpetas '{cfg.process_recup_prefix}*' dentro de: {cfg.root_dir}"
-        )
+    def decide(entry: FileEntry) -> Decision:
+        try:
+            with Image.open(entry.path) as img:
+                width, height = img.size
+        except Exception:
+            return False, "unreadable_image"
+        return _should_delete_by_dimensions(cfg, width, height)
+
+    return Rule(
+        selects=lambda entry: entry.extension in IMAGE_EXTENSIONS,
+        decide_cheap=lambda entry: None,
+        decide=decide,
+        probe_kind="pillow",
+    )
 
-    stats_total = PurgeStats()
 
-    for recup_dir in recup_dirs:
-        if os.path.basename(recup_dir) in cfg.exclude_dirnames:
-            continue
-
-        print(f"--- Procesando: {recup_dir} ---")
-        stats_dir = PurgeStats()
-
-        for entry in iter_files_in_dir(recup_dir):
-            if entry.extension not in IMAGE_EXTENSIONS:
-                continue
-
-            stats_total.scanned_files += 1
-            stats_dir.scanned_files += 1
-
-            try:
-                with Image.open(entry.path) as img:
-                    width, height = img.size
-            except Exception:
-                _apply_decision(
-                    entry=entry,
-                    should_delete=False,
-                    reason="unreadable_image",
-                    dry_run=cfg.dry_run,
-                    report_csv=report_paths.report_csv_path,
-                    stats_total=stats_total,
-                    stats_dir=stats_dir,
-                )
-                continue
-
-            should_delete, reason = _should_delete_by_dimensions(cfg, width, height)
-            _apply_decision(
-                entry=entry,
-                should_delete=should_delete,
-                reason=reason,
-                dry_run=cfg.dry_run,
-                report_csv=report_paths.report_csv_path,
-                stats_total=stats_total,
-                stats_dir=stats_dir,
-            )
-
-        _print_summary(stats_dir, stats_total, report_paths.report_csv_path)
-
-    _print_total(stats_total, report_paths.report_csv_path)
-    return report_paths.report_csv_path
+def purge_small_images(cfg: PurgeSmallImagesConfig) -> str:
+    return run_purge(cfg)
 
 
 # ── Purge short videos ─────────────────────────────────────────────
@@ -262,8 +239,30 @@ def _find_ffprobe() -> str:
     )
 
 
-def _get_video_duration(ffprobe_path: str, file_path: str) -> Optional[float]:
-    """Obtiene la duración de un video en segundos usando ffprobe."""
+def _find_ffmpeg() -> str:
+    """Busca ffmpeg: primero imageio-ffmpeg, luego el sistema."""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        pass
+
+    ffmpeg_sys = shutil.which("ffmpeg")
+    if ffmpeg_sys:
+        return ffmpeg_sys
+
+    raise FileNotFoundError(
+        "No se encontró ffmpeg. Instala 'imageio-ffmpeg' (pip install imageio-ffmpeg) "
+        "o instala FFmpeg en tu sistema."
+    )
+
+
+# (duración en segundos, (ancho, alto) del primer stream de video)
+VideoInfo = Tuple[Optional[float], Optional[Tuple[int, int]]]
+
+
+def _get_video_info(ffprobe_path: str, file_path: str) -> VideoInfo:
+    """Obtiene duración y resolución de un video usando ffprobe."""
     try:
         result = subprocess.run(
             [
@@ -271,6 +270,8 @@ def _get_video_duration(ffprobe_path: str, file_path: str) -> Optional[float]:
                 "-v", "quiet",
                 "-print_format", "json",
                 "-show_format",
+                "-show_streams",
+                "-select_streams", "v:0",
                 file_path,
             ],
             capture_output=True,
@@ -278,14 +279,67 @@ def _get_video_duration(ffprobe_path: str, file_path: str) -> Optional[float]:
             timeout=30,
         )
         if result.returncode != 0:
-            return None
+            return None, None
         data = json.loads(result.stdout)
+    except (subprocess.TimeoutExpired, json.JSONDecodeError, OSError):
+        return None, None
+
+    try:
         duration_str = data.get("format", {}).get("duration")
-        if duration_str is None:
-            return None
-        return float(duration_str)
-    except (subprocess.TimeoutExpired, json.JSONDecodeError, ValueError, OSError):
-        return None
+        duration = float(duration_str) if duration_str is not None else None
+    except ValueError:
+        duration = None
+
+    streams = data.get("streams") or [{}]
+    width, height = streams[0].get("width"), streams[0].get("height")
+    resolution = (int(width), int(height)) if width and height else None
+    return duration, resolution
+
+
+_FFMPEG_DURATION_RE = re.compile(r"Duration: (\d+):(\d{2}):(\d{2}(?:\.\d+)?)")
+_FFMPEG_RESOLUTION_RE = re.compile(r"Video: [^\n]*?, (\d+)x(\d+)")
+
+
+def _get_video_info_ffmpeg(ffmpeg_path: str, file_path: str) -> VideoInfo:
+    """Duración y resolución leídas de la cabecera que imprime `ffmpeg -i` (sin decodificar)."""
+    try:
+        result = subprocess.run(
+            [ffmpeg_path, "-hide_banner", "-nostdin", "-i", file_path],
+            capture_output=True,
+            text=True,
+            errors="replace",
+            timeout=30,
+        )
+    except (subprocess.TimeoutExpired, OSError):
+        return None, None
+
+    duration = None
+    match = _FFMPEG_DURATION_RE.search(result.stderr)
+    if match is not None:
+        hours, minutes, seconds = match.groups()
+        duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    resolution = None
+    match = _FFMPEG_RESOLUTION_RE.search(result.stderr)
+    if match is not None:
+        resolution = (int(match.group(1)), int(match.group(2)))
+    return duration, resolution
+
+
+def _video_prober(log: Log) -> Callable[[str], VideoInfo]:
+    """
+    ffprobe si está instalado; si no, ffmpeg. imageio-ffmpeg (la dependencia
+    declarada) solo trae el binario de ffmpeg.
+    """
+    try:
+        ffprobe_path = _find_ffprobe()
+    except FileNotFoundError:
+        ffmpeg_path = _find_ffmpeg()
+        log(f"ffprobe no encontrado; duración y resolución con ffmpeg: {ffmpeg_path}")
+        return lambda path: _get_video_info_ffmpeg(ffmpeg_path, path)
+
+    log(f"Usando ffprobe: {ffprobe_path}")
+    return lambda path: _get_video_info(ffprobe_path, path)
 
 
 def _should_delete_short_video(
@@ -300,51 +354,386 @@ def _should_delete_short_video(
     return False, "video_ok"
 
 
+def _short_videos_rule(cfg: PurgeShortVideosConfig, log: Log) -> Rule:
+    probe_video = _video_prober(log)
+
+    def decide_cheap(entry: FileEntry) -> Optional[Decision]:
+        if entry.size_bytes < cfg.min_size_bytes:
+            return _should_delete_short_video(cfg, None, entry.size_bytes)
+        return None
+
+    def decide(entry: FileEntry) -> Decision:
+        duration, _resolution = probe_video(entry.path)
+        return _should_delete_short_video(cfg, duration, entry.size_bytes)
+
+    return Rule(
+        selects=lambda entry: entry.extension in VIDEO_EXTENSIONS,
+        decide_cheap=decide_cheap,
+        decide=decide,
+        probe_kind="ffprobe",
+    )
+
+
 def purge_short_videos(cfg: PurgeShortVideosConfig) -> str:
-    ffprobe_path = _find_ffprobe()
-    print(f"Usando ffprobe: {ffprobe_path}")
+    return run_purge(cfg)
 
-    report_paths = ensure_reports_dir(cfg.root_dir, cfg.reports_dirname)
-    write_csv_header(report_paths.report_csv_path)
 
-    recup_dirs = list_recup_dirs(cfg.root_dir, cfg.process_recup_prefix)
-    if not recup_dirs:
-        raise FileNotFoundError(
-            f"No se encontraron carpetas '{cfg.process_recup_prefix}*' dentro de: {cfg.root_dir}"
-        )
+# ── Purge corrupt ──────────────────────────────────────────────────
 
-    stats_total = PurgeStats()
 
-    for recup_dir in recup_dirs:
-        if os.path.basename(recup_dir) in cfg.exclude_dirnames:
-            continue
+def _should_delete_corrupt(entry: FileEntry) -> Tuple[bool, str]:
+    try:
+        problem = check_integrity(entry.path, entry.extension)
+    except (OSError, ValueError):
+        return False, "unreadable_file"
+
+    if problem is not None:
+        return True, problem
+    return False, "structure_ok"
+
+
+def _corrupt_rule(cfg: PurgeCorruptConfig, log: Log) -> Rule:
+    return Rule(
+        selects=lambda entry: entry.extension in CHECKED_EXTENSIONS,
+        decide_cheap=lambda entry: (True, "empty_file") if entry.size_bytes == 0 else None,
+        decide=_should_delete_corrupt,
+    )
+
+
+def purge_corrupt(cfg: PurgeCorruptConfig) -> str:
+    return run_purge(cfg)
+
+
+# ── Purge app junk ─────────────────────────────────────────────────
+
+
+def _should_delete_app_junk(cfg: PurgeAppJunkConfig, header: ImageHeader) -> Tuple[bool, str]:
+    if header.screenshot_marker:
+        return True, "screenshot_marker"
+
+    if header.camera_exif:
+        return False, "camera_exif"
+
+    short_side = min(header.width, header.height)
+    long_side = max(header.width, header.height)
+    if (short_side, long_side) in cfg.screen_resolutions:
+        return True, f"screen_resolution_{header.width}x{header.height}"
+
+    # WhatsApp/Telegram re-encode sin EXIF y solo con JFIF (a veces ICC);
+    # XMP, Photoshop o Ducky indican que la imagen pasó por un editor.
+    if (
+        header.jpeg_quality is not None
+        and header.jpeg_quality <= cfg.messaging_max_quality
+        and long_side in cfg.messaging_max_sides
+        and header.app_signatures <= {"JFIF", "ICC_PROFILE"}
+    ):
+        return True, f"messaging_app_{long_side}px_q{header.jpeg_quality}"
+
+    return False, "no_app_signature"
+
 
-        print(f"--- Procesando: {recup_dir} ---")
-        stats_dir = PurgeStats()
+def _app_junk_rule(cfg: PurgeAppJunkConfig, log: Log) -> Rule:
+    def decide(entry: FileEntry) -> Decision:
+        try:
+            header = read_image_header(entry.path, entry.extension)
+        except (OSError, ValueError):
+            return False, "unreadable_file"
+        except (struct.error, IndexError):
+            return False, "unparseable_header"
+
+        if header is None:
+            return False, "unknown_signature"
+        return _should_delete_app_junk(cfg, header)
+
+    return Rule(
+        selects=lambda entry: entry.extension in CLASSIFIED_EXTENSIONS,
+        decide_cheap=lambda entry: None,
+        decide=decide,
+    )
+
+
+def purge_app_junk(cfg: PurgeAppJunkConfig) -> str:
+    """Borra capturas de pantalla e imágenes reenviadas por mensajería (solo cabeceras)."""
+    return run_purge(cfg)
+
+
+# ── Purge known ────────────────────────────────────────────────────
+
+
+def _known_rule(cfg: PurgeKnownConfig, log: Log) -> Rule:
+    index = load_index(cfg.index_dir)
+    log(f"Índice: {cfg.index_dir} ({len(index)} archivos)")
+
+    def decide_cheap(entry: FileEntry) -> Optional[Decision]:
+        if not index.has_size(entry.size_bytes):
+            return False, "not_in_library_size"
+        return None
+
+    def decide(entry: FileEntry) -> Decision:
+        try:
+            return index.match(entry.path, entry.size_bytes)
+        except OSError:
+            return False, "unreadable_file"
+
+    return Rule(selects=lambda entry: True, decide_cheap=decide_cheap, decide=decide)
+
+
+def purge_known(cfg: PurgeKnownConfig) -> str:
+    """Borra archivos recuperados que ya están en la biblioteca indexada."""
+    return run_purge(cfg)
+
+
+# ── Dedupe videos ──────────────────────────────────────────────────
+
+
+def _dedupe_decisions(
+    cfg: DedupeVideosConfig, recup_dirs: List[str], log: Log
+) -> Iterator[DecisionEvent]:
+    """Resuelve ffmpeg/ffprobe ya (como los constructores de reglas), antes del primer next()."""
+    probe_video = _video_prober(log)
+    ffmpeg_path = _find_ffmpeg()
+    log(f"Usando ffmpeg: {ffmpeg_path}")
+    return _iter_dedupe_decisions(cfg, recup_dirs, probe_video, ffmpeg_path, log)
+
+
+def _iter_dedupe_decisions(
+    cfg: DedupeVideosConfig,
+    recup_dirs: List[str],
+    probe_video: Callable[[str], VideoInfo],
+    ffmpeg_path: str,
+    log: Log,
+) -> Iterator[DecisionEvent]:
+    """
+    Agrupa videos casi idénticos (re-encodes, copias de WhatsApp) por huella de
+    frames muestreados y marca para borrar todos menos uno por grupo: el de mayor
+    resolución y, a igual resolución, el más grande.
+
+    Los frames se toman en fracciones fijas de la duración y solo se comparan
+    videos de duración casi igual: recortes y fragmentos de otro video no se
+    detectan.
+    """
+    import numpy as np
+
+    located = [
+        (recup_dir, entry)
+        for recup_dir in recup_dirs
+        for entry in iter_files_in_dir(recup_dir)
+        if entry.extension in VIDEO_EXTENSIONS
+    ]
+    entries = [entry for _recup_dir, entry in located]
+    log(f"Videos a huellar: {len(entries)}")
+
+    Fingerprint = Tuple[
+        Optional[float], Optional[Tuple[int, int]], Optional[Tuple[np.ndarray, np.ndarray]]
+    ]
+
+    def fingerprint(entry: FileEntry) -> Fingerprint:
+        duration, resolution = probe_video(entry.path)
+        if duration is None or duration <= 0:
+            return duration, resolution, None
+        frames = extract_frame_hashes(ffmpeg_path, entry.path, duration, cfg.frames)
+        return duration, resolution, frames
+
+    by_index: Dict[int, Fingerprint] = {}
+    with AutoTuner("ffprobe", initial=cfg.workers, log=log) as tuner:
+        log(f"Concurrencia ffprobe: inicial={tuner.limit}")
+        for i, result in tuner.map_unordered(
+            lambda i: (i, fingerprint(entries[i])), range(len(entries))
+        ):
+            by_index[i] = result
+    fingerprints = [by_index[i] for i in range(len(entries))]
+
+    decisions: Dict[int, Decision] = {}
+    hashed: List[int] = []
+    for i, (_duration, _resolution, frames) in enumerate(fingerprints):
+        if frames is None:
+            decisions[i] = (False, "unreadable_video")
+        elif not is_hashable(frames[1], cfg.min_informative_frames):
+            # Negro, fundidos o color liso: su huella coincidiría con cualquier otro
+            decisions[i] = (False, "unhashable_video")
+        else:
+            decisions[i] = (False, "unique_video")
+            hashed.append(i)
+
+    if hashed:
+        hashes = np.stack([fingerprints[i][2][0] for i in hashed])
+        informative = np.stack([fingerprints[i][2][1] for i in hashed])
+    else:
+        hashes = np.empty((0, cfg.frames), dtype=np.uint64)
+        informative = np.empty((0, cfg.frames), dtype=bool)
+    groups = group_near_duplicates(
+        [fingerprints[i][0] for i in hashed],
+        hashes,
+        informative,
+        cfg.max_distance,
+        cfg.duration_tolerance_secs,
+        cfg.duration_tolerance_ratio,
+        cfg.min_informative_frames,
+    )
+
+    sizes = [entry.size_bytes for entry in entries]
+    paths = [entry.path for entry in entries]
+    resolutions = [resolution for _duration, resolution, _frames in fingerprints]
+    for members in groups:
+        members = [hashed[m] for m in members]
+        keeper = pick_keeper(sizes, paths, members, resolutions)
+        decisions[keeper] = (False, "duplicate_group_keeper")
+        for i in members:
+            if i != keeper:
+                decisions[i] = (True, f"near_duplicate_of_{entries[keeper].name}")
+    log(f"Grupos de duplicados: {len(groups)}")
+
+    if cfg.reclaim_target_bytes is None:
+        # located sigue el orden de las carpetas: cada una cierra con su DirDone.
+        by_dir = itertools.groupby(range(len(entries)), key=lambda i: located[i][0])
+        for recup_dir, indices in by_dir:
+            for i in indices:
+                should_delete, reason = decisions[i]
+                yield DecisionRecord(recup_dir, entries[i], should_delete, reason)
+            yield DirDone(recup_dir)
+        return
+
+    # Con objetivo de espacio, solo los duplicados más grandes hasta alcanzarlo.
+    reclaimed = 0
+    for i in sorted((i for i in decisions if decisions[i][0]), key=lambda i: -sizes[i]):
+        if reclaimed >= cfg.reclaim_target_bytes:
+            break
+        reclaimed += sizes[i]
+        yield DecisionRecord(located[i][0], entries[i], True, decisions[i][1])
+
+
+def dedupe_videos(cfg: DedupeVideosConfig) -> str:
+    return run_purge(cfg)
+
+
+# ── Streaming API ──────────────────────────────────────────────────
 
-        for entry in iter_files_in_dir(recup_dir):
-            if entry.extension not in VIDEO_EXTENSIONS:
-                continue
 
-            stats_total.scanned_files += 1
-            stats_dir.scanned_files += 1
+_RULE_BUILDERS: Dict[type, Callable[..., Rule]] = {
+    PurgeByTypeConfig: _by_type_rule,
+    PurgeSmallImagesConfig: _small_images_rule,
+    PurgeShortVideosConfig: _short_videos_rule,
+    PurgeCorruptConfig: _corrupt_rule,
+    PurgeAppJunkConfig: _app_junk_rule,
+    PurgeKnownConfig: _known_rule,
+}
 
-            duration = _get_video_duration(ffprobe_path, entry.path)
 
-            should_delete, reason = _should_delete_short_video(
-                cfg, duration, entry.size_bytes
-            )
-            _apply_decision(
-                entry=entry,
-                should_delete=should_delete,
-                reason=reason,
-                dry_run=cfg.dry_run,
-                report_csv=report_paths.report_csv_path,
-                stats_total=stats_total,
-                stats_dir=stats_dir,
-            )
+def iter_decisions(cfg: PurgeConfig, log: Log = silent) -> Iterator[DecisionEvent]:
+    """
+    Genera un DecisionRecord por archivo evaluado, sin borrar, escribir ni imprimir,
+    y un DirDone al terminar cada carpeta (salvo con objetivo de espacio).
 
-        _print_summary(stats_dir, stats_total, report_paths.report_csv_path)
+    Es la API para embeber: combinar con apply_decisions (y los consumidores de
+    pipeline.py) para aplicar las decisiones, o consumirlas directamente.
+    """
+    recup_dirs = _list_target_dirs(cfg, log)
+    if isinstance(cfg, DedupeVideosConfig):
+        return _dedupe_decisions(cfg, recup_dirs, log)
 
-    _print_total(stats_total, report_paths.report_csv_path)
+    rule = _RULE_BUILDERS[type(cfg)](cfg, log)
+    return iter_rule_decisions(
+        rule,
+        recup_dirs,
+        device_path=cfg.root_dir,
+        reclaim_target_bytes=cfg.reclaim_target_bytes,
+        log=log,
+    )
+
+
+def aiter_decisions(
+    cfg: PurgeConfig, maxsize: int = 256, log: Log = silent
+) -> AsyncIterator[DecisionEvent]:
+    """Variante asyncio de iter_decisions; el escaneo se frena si no se consume."""
+    return aiter_in_thread(lambda: iter_decisions(cfg, log), maxsize)
+
+
+def run_purge(
+    cfg: PurgeConfig,
+    consumers: Iterable[DecisionConsumer] = (),
+    log: Log = print,
+) -> str:
+    """
+    Ejecuta una regla completa: reporte CSV, borrado (o cuarentena), progreso y
+    stats. `consumers` añade efectos propios a los de serie. Devuelve el CSV.
+    """
+    # Productor, sink y pools de tuning escriben desde threads distintos.
+    log = locked(log)
+    decisions = iter_decisions(cfg, log)
+    report_paths = _start_report(cfg)
+    quarantine = _open_quarantine(cfg, report_paths.report_csv_path, log)
+
+    stats = StatsConsumer()
+    try:
+        apply_decisions(
+            decisions,
+            [
+                CsvReportConsumer(report_paths.report_csv_path, cfg.dry_run),
+                stats,
+                ProgressConsumer(stats, log),
+                *consumers,
+            ],
+            dry_run=cfg.dry_run,
+            quarantine=quarantine,
+            device_path=cfg.root_dir,
+            log=log,
+        )
+    finally:
+        if quarantine is not None:
+            quarantine.close()
+
+    _finish_run(stats.total, report_paths.report_csv_path, log)
     return report_paths.report_csv_path
+
+
+# ── Merge reports ──────────────────────────────────────────────────
+
+
+def _stats_from_rows(rows: List[List[str]]) -> PurgeStats:
+    """Reconstruye stats desde las filas (no incluye errores de borrado)."""
+    stats = PurgeStats()
+    for action, _dry_run, _reason, _ext, size_str, _path in rows:
+        size_bytes = int(size_str)
+        stats.scanned_files += 1
+        if action == "delete":
+            stats.deleted_files += 1
+            stats.deleted_bytes += size_bytes
+        else:
+            stats.kept_files += 1
+            stats.kept_bytes += size_bytes
+    return stats
+
+
+def merge_reports(report_csvs: List[str], output_csv: Optional[str] = None) -> str:
+    """
+    Une los reportes de varios shards en un solo CSV y suma sus PurgeStats.
+
+    Usa el .stats.json de cada reporte si existe; si no, lo deriva de sus filas.
+    """
+    if not report_csvs:
+        raise ValueError("No se indicaron reportes para unir.")
+
+    if output_csv is None:
+        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_csv = os.path.join(os.path.dirname(report_csvs[0]), f"merged_{ts}.csv")
+    write_csv_header(output_csv)
+
+    stats_total = PurgeStats()
+    for report_csv in report_csvs:
+        rows = list(iter_csv_rows(report_csv))
+        write_csv_rows(output_csv, rows)
+
+        saved = read_stats_json(report_csv)
+        stats = PurgeStats(**saved) if saved is not None else _stats_from_rows(rows)
+        for field in fields(PurgeStats):
+            total = getattr(stats_total, field.name) + getattr(stats, field.name)
+            setattr(stats_total, field.name, total)
+
+        print(
+            f"{os.path.basename(report_csv)}: "
+            f"scanned={stats.scanned_files} delete={stats.deleted_files} "
+            f"keep={stats.kept_files} errors={stats.errors}"
+        )
+
+    _finish_run(stats_total, output_csv)
+    return output_csv
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import csv
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional, Tuple
+
+
+MANIFEST_FILENAME = "manifest.csv"
+RUN_INFO_FILENAME = "run.json"
+
+
+class QuarantineRun:
+    """
+    Mueve archivos a un árbol de cuarentena que replica la estructura de root_dir.
+
+    Cada ejecución vive en <quarantine_dir>/<run_id>/ con un run.json (root de
+    origen) y un manifest.csv con una fila por archivo: tamaño y ruta relativa.
+    """
+
+    def __init__(self, quarantine_dir: str, root_dir: str, run_id: Optional[str] = None) -> None:
+        os.makedirs(quarantine_dir, exist_ok=True)
+        if os.stat(quarantine_dir).st_dev != os.stat(root_dir).st_dev:
+            raise ValueError(
+                f"La cuarentena debe estar en el mismo sistema de archivos que: {root_dir}"
+            )
+
+        self.root_dir = root_dir
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        self.run_dir = os.path.join(quarantine_dir, self.run_id)
+        os.makedirs(self.run_dir, exist_ok=False)
+
+        with open(os.path.join(self.run_dir, RUN_INFO_FILENAME), "w", encoding="utf-8") as f:
+            json.dump({"run_id": self.run_id, "root_dir": root_dir}, f)
+
+        # Existe desde el inicio: una ejecución que no mueve nada también se puede restaurar.
+        # Un solo handle para toda la ejecución; se vuelca con flush() por carpeta.
+        self.manifest_path = os.path.join(self.run_dir, MANIFEST_FILENAME)
+        self._manifest = open(self.manifest_path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._manifest)
+        self._created_dirs: set[str] = set()
+        # move() se llama desde varios workers de borrado a la vez; el lock solo
+        # protege la escritura en el buffer, no el rename.
+        self._manifest_lock = threading.Lock()
+
+    def move(self, path: str, size_bytes: int) -> None:
+        """Renombra path dentro de la cuarentena. Lanza OSError si falla."""
+        rel = os.path.relpath(path, self.root_dir)
+        dst = os.path.join(self.run_dir, rel)
+
+        parent = os.path.dirname(dst)
+        if parent not in self._created_dirs:
+            os.makedirs(parent, exist_ok=True)
+            self._created_dirs.add(parent)
+
+        # Intención antes del rename: restore ignora las filas cuyo archivo sigue en su sitio.
+        with self._manifest_lock:
+            self._writer.writerow([size_bytes, rel])
+        os.rename(path, dst)
+
+    def flush(self) -> None:
+        with self._manifest_lock:
+            self._manifest.flush()
+
+    def close(self) -> None:
+        with self._manifest_lock:
+            self._manifest.close()
+
+
+def list_runs(quarantine_dir: str) -> list[str]:
+    try:
+        names = os.listdir(quarantine_dir)
+    except FileNotFoundError:
+        return []
+    runs = [
+        name
+        for name in names
+        if os.path.isfile(os.path.join(quarantine_dir, name, RUN_INFO_FILENAME))
+    ]
+    runs.sort()
+    return runs
+
+
+def run_dir_for(quarantine_dir: str, run_id: str) -> str:
+    """
+    Carpeta de una ejecución existente. Solo acepta ids de list_runs (tienen
+    run.json y son un nombre directo de quarantine_dir: sin separadores ni '..').
+    """
+    if run_id not in list_runs(quarantine_dir):
+        raise ValueError(f"No existe la ejecución '{run_id}' en la cuarentena: {quarantine_dir}")
+    return os.path.join(quarantine_dir, run_id)
+
+
+def _remove_empty_dirs(top: str) -> None:
+    for root, _dirs, _files in os.walk(top, topdown=False):
+        try:
+            os.rmdir(root)
+        except OSError:
+            pass
+
+
+def restore_run(quarantine_dir: str, run_id: str, workers: int = 16) -> Tuple[int, int]:
+    """Devuelve los archivos de una ejecución a su ruta original. Retorna (restaurados, errores)."""
+    run_dir = run_dir_for(quarantine_dir, run_id)
+    with open(os.path.join(run_dir, RUN_INFO_FILENAME), encoding="utf-8") as f:
+        root_dir = json.load(f)["root_dir"]
+
+    manifest_path = os.path.join(run_dir, MANIFEST_FILENAME)
+    try:
+        with open(manifest_path, newline="", encoding="utf-8") as f:
+            rows = [row for row in csv.reader(f) if row]
+    except FileNotFoundError:
+        rows = []
+
+    # La cuarentena replica el árbol de root_dir: lo que esté en run_dir y falte
+    # en el manifest (caída antes del último flush) también se restaura.
+    listed = {row[1] for row in rows}
+    meta = {RUN_INFO_FILENAME, MANIFEST_FILENAME}
+    for root, _dirs, files in os.walk(run_dir):
+        for name in files:
+            rel = os.path.relpath(os.path.join(root, name), run_dir)
+            if rel not in meta and rel not in listed:
+                rows.append(["", rel])
+                listed.add(rel)
+    rel_paths = [row[1] for row in rows]
+
+    # Crear primero los directorios de destino evita carreras entre workers.
+    for parent in {os.path.dirname(rel) for rel in rel_paths}:
+        os.makedirs(os.path.join(root_dir, parent), exist_ok=True)
+
+    def _restore(rel: str) -> bool:
+        src = os.path.join(run_dir, rel)
+        dst = os.path.join(root_dir, rel)
+        if not os.path.lexists(src):
+            # Fila de intención cuyo rename no llegó a hacerse: el archivo sigue en root.
+            return os.path.lexists(dst)
+        if os.path.exists(dst):
+            return False
+        try:
+            os.rename(src, dst)
+            return True
+        except OSError:
+            return False
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_restore, rel_paths))
+
+    restored = sum(results)
+    errors = len(results) - restored
+    if errors == 0:
+        shutil.rmtree(run_dir, ignore_errors=True)
+        return restored, errors
+
+    # Dejar en el manifest solo lo que sigue en cuarentena, para poder reintentar.
+    with open(manifest_path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(row for row, ok in zip(rows, results) if not ok)
+    _remove_empty_dirs(run_dir)
+    return restored, errors
+
+
+def purge_run(quarantine_dir: str, run_id: str, workers: int = 16) -> Tuple[int, int]:
+    """Borra definitivamente una ejecución de la cuarentena. Retorna (borrados, errores)."""
+    run_dir = run_dir_for(quarantine_dir, run_id)
+    meta = {os.path.join(run_dir, RUN_INFO_FILENAME), os.path.join(run_dir, MANIFEST_FILENAME)}
+
+    paths = [
+        os.path.join(root, name)
+        for root, _dirs, files in os.walk(run_dir)
+        for name in files
+        if os.path.join(root, name) not in meta
+    ]
+
+    def _unlink(path: str) -> bool:
+        try:
+            os.unlink(path)
+            return True
+        except OSError:
+            return False
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_unlink, paths))
+
+    deleted = sum(results)
+    errors = len(results) - deleted
+    if errors == 0:
+        shutil.rmtree(run_dir, ignore_errors=True)
+    return deleted, errors
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
 import csv
+import itertools
+import json
 import os
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Iterable, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
 
 
 @dataclass(frozen=True)
@@ -13,32 +15,43 @@ class ReportPaths:
     report_csv_path: str
 
 
-def ensure_reports_dir(root_dir: str, reports_dirname: str = "_reports") -> ReportPaths:
+CSV_HEADER: List[str] = ["action", "dry_run", "reason", "extension", "size_bytes", "path"]
+
+
+def ensure_reports_dir(
+    root_dir: str,
+    reports_dirname: str = "_reports",
+    suffix: str = "",
+    prefix: str = "purge_by_type",
+) -> ReportPaths:
+    """
+    Reserva un nombre de reporte único: <prefix>_<fecha con microsegundos><suffix>.csv.
+
+    El archivo se crea con O_EXCL, así que dos ejecuciones lanzadas en el mismo
+    instante nunca comparten CSV ni id de cuarentena.
+    """
     reports_dir = os.path.join(root_dir, reports_dirname)
     os.makedirs(reports_dir, exist_ok=True)
 
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    report_csv_path = os.path.join(reports_dir, f"purge_by_type_{ts}.csv")
-    return ReportPaths(reports_dir=reports_dir, report_csv_path=report_csv_path)
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    for n in itertools.count():
+        counter = f"_{n}" if n else ""
+        report_csv_path = os.path.join(reports_dir, f"{prefix}_{ts}{suffix}{counter}.csv")
+        try:
+            os.close(os.open(report_csv_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            continue
+        return ReportPaths(reports_dir=reports_dir, report_csv_path=report_csv_path)
+    raise AssertionError("unreachable")
 
 
 def write_csv_header(path: str) -> None:
     with open(path, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
-        writer.writerow(
-            [
-                "action",
-                "dry_run",
-                "reason",
-                "extension",
-                "size_bytes",
-                "path",
-            ]
-        )
-
-
-def append_csv_row(
-    path: str,
+        writer.writerow(CSV_HEADER)
+
+
+def csv_row(
     *,
     action: str,
     dry_run: bool,
@@ -46,7 +59,37 @@ def append_csv_row(
     extension: str,
     size_bytes: int,
     file_path: str,
-) -> None:
+) -> List[str]:
+    return [action, str(dry_run), reason, extension, str(size_bytes), file_path]
+
+
+def stats_json_path(report_csv_path: str) -> str:
+    return os.path.splitext(report_csv_path)[0] + ".stats.json"
+
+
+def write_stats_json(report_csv_path: str, stats: Dict[str, int]) -> str:
+    path = stats_json_path(report_csv_path)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(stats, f, indent=2)
+    return path
+
+
+def read_stats_json(report_csv_path: str) -> Optional[Dict[str, int]]:
+    try:
+        with open(stats_json_path(report_csv_path), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def iter_csv_rows(path: str) -> Iterator[List[str]]:
+    """Itera las filas de un reporte, sin la cabecera."""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        yield from reader
+
+
+def write_csv_rows(path: str, rows: Iterable[List[str]]) -> None:
     with open(path, "a", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow([action, str(dry_run), reason, extension, str(size_bytes), file_path])
+        csv.writer(f).writerows(rows)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import FrozenSet
+from typing import FrozenSet, Optional, Tuple
 
 
 DEFAULT_ALLOWED_EXTENSIONS: FrozenSet[str] = frozenset(
@@ -50,6 +50,18 @@ class PurgeByTypeConfig:
     # Safety: never touch these folders
     exclude_dirnames: FrozenSet[str] = frozenset({"_reports"})
 
+    # If set, deletions are moved here (same filesystem) instead of removed
+    quarantine_dir: Optional[str] = None
+
+    # Multi-node: process only shard_index of shard_count (folder-name hash,
+    # or the shared plan file written by plan-shards)
+    shard_index: int = 0
+    shard_count: int = 1
+    shard_plan: Optional[str] = None
+
+    # Stop once this many bytes are deleted, biggest candidates first
+    reclaim_target_bytes: Optional[int] = None
+
 
 IMAGE_EXTENSIONS: FrozenSet[str] = frozenset(
     {
@@ -78,6 +90,18 @@ class PurgeSmallImagesConfig:
     reports_dirname: str = "_reports"
     exclude_dirnames: FrozenSet[str] = frozenset({"_reports"})
 
+    # If set, deletions are moved here (same filesystem) instead of removed
+    quarantine_dir: Optional[str] = None
+
+    # Multi-node: process only shard_index of shard_count (folder-name hash,
+    # or the shared plan file written by plan-shards)
+    shard_index: int = 0
+    shard_count: int = 1
+    shard_plan: Optional[str] = None
+
+    # Stop once this many bytes are deleted, biggest candidates first
+    reclaim_target_bytes: Optional[int] = None
+
 
 VIDEO_EXTENSIONS: FrozenSet[str] = frozenset(
     {
@@ -105,3 +129,164 @@ class PurgeShortVideosConfig:
 
     reports_dirname: str = "_reports"
     exclude_dirnames: FrozenSet[str] = frozenset({"_reports"})
+
+    # If set, deletions are moved here (same filesystem) instead of removed
+    quarantine_dir: Optional[str] = None
+
+    # Multi-node: process only shard_index of shard_count (folder-name hash,
+    # or the shared plan file written by plan-shards)
+    shard_index: int = 0
+    shard_count: int = 1
+    shard_plan: Optional[str] = None
+
+    # Stop once this many bytes are deleted, biggest candidates first
+    reclaim_target_bytes: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class PurgeCorruptConfig:
+    root_dir: str
+    process_recup_prefix: str = "recup_dir"
+
+    dry_run: bool = True
+
+    reports_dirname: str = "_reports"
+    exclude_dirnames: FrozenSet[str] = frozenset({"_reports"})
+
+    # If set, deletions are moved here (same filesystem) instead of removed
+    quarantine_dir: Optional[str] = None
+
+    # Multi-node: process only shard_index of shard_count (folder-name hash,
+    # or the shared plan file written by plan-shards)
+    shard_index: int = 0
+    shard_count: int = 1
+    shard_plan: Optional[str] = None
+
+    # Stop once this many bytes are deleted, biggest candidates first
+    reclaim_target_bytes: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class DedupeVideosConfig:
+    root_dir: str
+    process_recup_prefix: str = "recup_dir"
+
+    dry_run: bool = True
+
+    # Frames sampled per video, at fixed fractions of its duration
+    frames: int = 8
+    # Mean dHash distance per frame (out of 64 bits) to consider two videos equal
+    max_distance: float = 10.0
+    # Frames with real content (not black/uniform) both videos must share to be compared
+    min_informative_frames: int = 3
+    # Only videos whose durations differ by less than max(secs, ratio * duration)
+    duration_tolerance_secs: float = 1.0
+    duration_tolerance_ratio: float = 0.02
+    # Concurrent ffprobe/ffmpeg processes
+    workers: int = 8
+
+    reports_dirname: str = "_reports"
+    exclude_dirnames: FrozenSet[str] = frozenset({"_reports"})
+
+    # If set, deletions are moved here (same filesystem) instead of removed
+    quarantine_dir: Optional[str] = None
+
+    # Multi-node: process only shard_index of shard_count (folder-name hash,
+    # or the shared plan file written by plan-shards)
+    shard_index: int = 0
+    shard_count: int = 1
+    shard_plan: Optional[str] = None
+
+    # Stop once this many bytes are deleted, biggest candidates first
+    reclaim_target_bytes: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class PurgeKnownConfig:
+    root_dir: str
+    # Index built by index-library from the reference photo library
+    index_dir: str
+    process_recup_prefix: str = "recup_dir"
+
+    dry_run: bool = True
+
+    reports_dirname: str = "_reports"
+    exclude_dirnames: FrozenSet[str] = frozenset({"_reports"})
+
+    # If set, deletions are moved here (same filesystem) instead of removed
+    quarantine_dir: Optional[str] = None
+
+    # Multi-node: process only shard_index of shard_count (folder-name hash,
+    # or the shared plan file written by plan-shards)
+    shard_index: int = 0
+    shard_count: int = 1
+    shard_plan: Optional[str] = None
+
+    # Stop once this many bytes are deleted, biggest candidates first
+    reclaim_target_bytes: Optional[int] = None
+
+
+# Common phone screens as (short side, long side): exact matches are screenshots
+DEFAULT_SCREEN_RESOLUTIONS: FrozenSet[Tuple[int, int]] = frozenset(
+    {
+        # iPhone
+        (640, 960),
+        (640, 1136),
+        (750, 1334),
+        (828, 1792),
+        (1080, 1920),
+        (1125, 2436),
+        (1170, 2532),
+        (1179, 2556),
+        (1242, 2208),
+        (1242, 2688),
+        (1284, 2778),
+        (1290, 2796),
+
+        # Android
+        (480, 800),
+        (720, 1280),
+        (720, 1520),
+        (720, 1600),
+        (1080, 2160),
+        (1080, 2220),
+        (1080, 2280),
+        (1080, 2340),
+        (1080, 2400),
+        (1080, 2408),
+        (1440, 2560),
+        (1440, 2960),
+        (1440, 3040),
+        (1440, 3088),
+        (1440, 3200),
+    }
+)
+
+
+@dataclass(frozen=True)
+class PurgeAppJunkConfig:
+    root_dir: str
+    process_recup_prefix: str = "recup_dir"
+
+    dry_run: bool = True
+
+    screen_resolutions: FrozenSet[Tuple[int, int]] = DEFAULT_SCREEN_RESOLUTIONS
+    # Long side WhatsApp/Telegram resize forwarded photos to
+    messaging_max_sides: FrozenSet[int] = frozenset({1280, 1600, 2560})
+    # JPEGs without camera EXIF at or below this estimated quality count as forwarded
+    messaging_max_quality: int = 85
+
+    reports_dirname: str = "_reports"
+    exclude_dirnames: FrozenSet[str] = frozenset({"_reports"})
+
+    # If set, deletions are moved here (same filesystem) instead of removed
+    quarantine_dir: Optional[str] = None
+
+    # Multi-node: process only shard_index of shard_count (folder-name hash,
+    # or the shared plan file written by plan-shards)
+    shard_index: int = 0
+    shard_count: int = 1
+    shard_plan: Optional[str] = None
+
+    # Stop once this many bytes are deleted, biggest candidates first
+    reclaim_target_bytes: Optional[int] = None
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import heapq
+import json
 import os
+import zlib
 from dataclasses import dataclass
-from typing import Iterable, Iterator, Optional
+from typing import Dict, Iterable, Iterator, Optional, Tuple
 
 
 @dataclass(frozen=True)
@@ -28,6 +31,64 @@ def list_recup_dirs(root_dir: str, prefix: str = "recup_dir") -> list[str]:
     return dirs
 
 
+def _dir_size_bytes(dir_path: str) -> int:
+    total = 0
+    for entry in iter_files_in_dir(dir_path):
+        total += entry.size_bytes
+    return total
+
+
+def plan_shards(dirs: list[str], count: int) -> Dict[str, int]:
+    """Reparto greedy por bytes totales (pre-escaneo con stat): nombre de carpeta -> shard."""
+    sized = sorted(((_dir_size_bytes(d), os.path.basename(d)) for d in dirs), reverse=True)
+    loads = [(0, i) for i in range(count)]
+    plan: Dict[str, int] = {}
+    for size_bytes, name in sized:
+        load, shard = heapq.heappop(loads)
+        plan[name] = shard
+        heapq.heappush(loads, (load + size_bytes, shard))
+    return plan
+
+
+def write_shard_plan(path: str, plan: Dict[str, int], count: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"shard_count": count, "dirs": plan}, f, indent=2, sort_keys=True)
+
+
+def read_shard_plan(path: str) -> Tuple[int, Dict[str, int]]:
+    """Devuelve (shard_count, nombre de carpeta -> shard) de un plan de plan-shards."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return int(data["shard_count"]), {name: int(shard) for name, shard in data["dirs"].items()}
+
+
+def _hash_shard(dir_path: str, count: int) -> int:
+    return zlib.crc32(os.path.basename(dir_path).encode("utf-8")) % count
+
+
+def shard_recup_dirs(
+    dirs: list[str], index: int, count: int, plan: Optional[Dict[str, int]] = None
+) -> list[str]:
+    """
+    Devuelve la parte de dirs que le toca al shard index de count.
+
+    Sin plan: crc32 del nombre de carpeta; estable aunque el árbol cambie.
+    Con plan (calculado una vez por plan-shards y compartido por todos los
+    nodos): la asignación del plan; las carpetas que no figuran en él se
+    reparten por hash, así el resultado sigue siendo una partición.
+    """
+    if count <= 1:
+        return list(dirs)
+    if not 0 <= index < count:
+        raise ValueError(f"Shard fuera de rango: {index}/{count}")
+
+    if plan is None:
+        return [d for d in dirs if _hash_shard(d, count) == index]
+    return [
+        d for d in dirs if plan.get(os.path.basename(d), _hash_shard(d, count)) == index
+    ]
+
+
 def iter_files_in_dir(dir_path: str) -> Iterator[FileEntry]:
     for root, _dirs, files in os.walk(dir_path):
         for filename in files:
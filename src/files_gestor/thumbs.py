@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import hashlib
+import html
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .report import iter_csv_rows
+from .rules import IMAGE_EXTENSIONS
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "files_gestor", "thumbs")
+DEFAULT_CACHE_MAX_BYTES = 1_000_000_000
+
+THUMB_SIZE = 256
+PER_PAGE = 200
+
+
+@dataclass(frozen=True)
+class ReviewItem:
+    reason: str
+    action: str
+    size_bytes: int
+    path: str
+    # Miniatura en la caché; None si no hay (no es imagen, falta el archivo o falló)
+    thumb_path: Optional[str] = None
+
+
+def thumb_cache_path(
+    cache_dir: str, path: str, size_bytes: int, mtime_ns: int, thumb_size: int
+) -> str:
+    """Ruta en la caché: sha1 de ruta + tamaño + mtime, repartida en 256 subcarpetas."""
+    key = f"{path}\0{size_bytes}\0{mtime_ns}\0{thumb_size}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, digest[:2], f"{digest}.jpg")
+
+
+def _make_thumb(job: Tuple[str, str, int]) -> bool:
+    """
+    Genera una miniatura JPEG (se ejecuta en un proceso del pool).
+
+    draft() deja que el decoder JPEG escale por DCT (1/2..1/8) sin decodificar
+    a tamaño completo; thumbnail() termina con reduce() + un filtro sobre la
+    imagen ya pequeña. Si falla deja un archivo vacío para no reintentar.
+    """
+    from PIL import Image
+
+    src, dest, thumb_size = job
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = f"{dest}.{os.getpid()}.tmp"
+    try:
+        with Image.open(src) as img:
+            img.draft("RGB", (thumb_size, thumb_size))
+            img.thumbnail((thumb_size, thumb_size), reducing_gap=2.0)
+            img.convert("RGB").save(tmp, "JPEG", quality=80)
+        ok = True
+    except Exception:
+        open(tmp, "wb").close()
+        ok = False
+    os.replace(tmp, dest)
+    return ok
+
+
+def evict_cache(cache_dir: str, max_bytes: int) -> int:
+    """Borra las miniaturas usadas hace más tiempo (mtime) hasta bajar de max_bytes."""
+    entries: List[Tuple[float, int, str]] = []
+    total = 0
+    for dirpath, _dirnames, filenames in os.walk(cache_dir):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+    removed = 0
+    entries.sort()
+    for _mtime, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+
+def build_thumbs(
+    report_csv: str,
+    cache_dir: str = DEFAULT_CACHE_DIR,
+    cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+    thumb_size: int = THUMB_SIZE,
+    workers: Optional[int] = None,
+    include_keep: bool = False,
+) -> List[ReviewItem]:
+    """Lee un reporte y devuelve sus filas con la miniatura ya en caché."""
+    items: List[ReviewItem] = []
+    jobs: List[Tuple[str, str, int]] = []
+    hits = 0
+
+    for action, _dry_run, reason, extension, size_str, path in iter_csv_rows(report_csv):
+        if action != "delete" and not include_keep:
+            continue
+
+        thumb: Optional[str] = None
+        if extension in IMAGE_EXTENSIONS:
+            try:
+                st = os.stat(path)
+            except OSError:
+                st = None
+            if st is not None:
+                thumb = thumb_cache_path(cache_dir, path, st.st_size, st.st_mtime_ns, thumb_size)
+                try:
+                    # Un acierto renueva el mtime: es lo que usa evict_cache como LRU.
+                    os.utime(thumb)
+                    hits += 1
+                except FileNotFoundError:
+                    jobs.append((path, thumb, thumb_size))
+
+        items.append(ReviewItem(reason, action, int(size_str), path, thumb))
+
+    failed = evicted = 0
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            failed = sum(1 for ok in pool.map(_make_thumb, jobs, chunksize=16) if not ok)
+        # Solo crece al generar: con todo en caché no hace falta recorrerla.
+        evicted = evict_cache(cache_dir, cache_max_bytes)
+    print(
+        f"Miniaturas: en caché={hits} generadas={len(jobs) - failed} "
+        f"fallidas={failed} expulsadas={evicted}"
+    )
+    return items
+
+
+def reason_category(reason: str) -> str:
+    """
+    Motivo sin su valor: below_min_dimensions_500x500 -> below_min_dimensions,
+    messaging_app_1600px_q70 -> messaging_app, near_duplicate_of_x.mp4 -> near_duplicate.
+    """
+    if reason.startswith("near_duplicate_of_"):
+        return "near_duplicate"
+    tokens = reason.split("_")
+    # El primer token puede llevar dígitos sin ser un valor (mp4_missing_moov).
+    for i in range(1, len(tokens)):
+        if any(ch.isdigit() for ch in tokens[i]):
+            return "_".join(tokens[:i])
+    return reason
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", text) or "_"
+
+
+def _page_name(group_index: int, category: str, page: int) -> str:
+    # El índice de grupo hace único el nombre aunque dos categorías den el mismo slug
+    return f"{group_index:03d}_{_slug(category)}_{page + 1}.html"
+
+
+_STYLE = (
+    "body{font-family:sans-serif;background:#222;color:#ddd}"
+    "a{color:#8cf}"
+    ".grid{display:flex;flex-wrap:wrap;gap:8px}"
+    ".item{width:%(size)dpx;font-size:11px;word-break:break-all}"
+    ".thumb{width:%(size)dpx;height:%(size)dpx;display:flex;align-items:center;"
+    "justify-content:center;background:#333}"
+    ".thumb img{max-width:100%%;max-height:100%%}"
+)
+
+
+def _page_html(title: str, body: str, thumb_size: int) -> str:
+    return (
+        "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+        f"<title>{html.escape(title)}</title>"
+        f"<style>{_STYLE % {'size': thumb_size}}</style></head>"
+        f"<body>{body}</body></html>\n"
+    )
+
+
+def _has_thumb(item: ReviewItem) -> bool:
+    # Vacía = la imagen no se pudo abrir; ausente = expulsada por un límite de caché pequeño
+    try:
+        return item.thumb_path is not None and os.path.getsize(item.thumb_path) > 0
+    except OSError:
+        return False
+
+
+def _item_html(item: ReviewItem) -> str:
+    if _has_thumb(item):
+        inner = f"<img loading=\"lazy\" src=\"{Path(item.thumb_path).as_uri()}\">"
+    else:
+        inner = html.escape(os.path.splitext(item.path)[1] or "?")
+    link = Path(item.path).as_uri()
+    return (
+        f"<div class=\"item\"><a class=\"thumb\" href=\"{link}\">{inner}</a>"
+        f"{html.escape(item.action)} · {item.size_bytes / 1_000:.0f} KB<br>"
+        f"{html.escape(item.reason)}<br>"
+        f"{html.escape(item.path)}</div>"
+    )
+
+
+def write_contact_sheets(
+    items: List[ReviewItem],
+    output_dir: str,
+    title: str,
+    per_page: int = PER_PAGE,
+    thumb_size: int = THUMB_SIZE,
+) -> str:
+    """
+    Escribe index.html y páginas de per_page miniaturas por categoría de motivo
+    (cada miniatura muestra su motivo completo). Devuelve index.html.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    by_category: Dict[str, List[ReviewItem]] = {}
+    for item in items:
+        by_category.setdefault(reason_category(item.reason), []).append(item)
+    categories = sorted(by_category, key=lambda c: (-len(by_category[c]), c))
+
+    index_rows = []
+    for group_index, category in enumerate(categories):
+        group = by_category[category]
+        pages = [group[i : i + per_page] for i in range(0, len(group), per_page)]
+
+        for page, page_items in enumerate(pages):
+            nav = " ".join(
+                f"<b>{n + 1}</b>"
+                if n == page
+                else f"<a href=\"{_page_name(group_index, category, n)}\">{n + 1}</a>"
+                for n in range(len(pages))
+            )
+            body = (
+                f"<p><a href=\"index.html\">Índice</a> · {html.escape(category)} "
+                f"({len(group)} archivos) · página {nav}</p>"
+                f"<div class=\"grid\">{''.join(_item_html(item) for item in page_items)}</div>"
+            )
+            page_path = os.path.join(output_dir, _page_name(group_index, category, page))
+            with open(page_path, "w", encoding="utf-8") as f:
+                f.write(_page_html(f"{category} ({page + 1}/{len(pages)})", body, thumb_size))
+
+        total_bytes = sum(item.size_bytes for item in group)
+        first_page = _page_name(group_index, category, 0)
+        index_rows.append(
+            f"<tr><td><a href=\"{first_page}\">{html.escape(category)}</a></td>"
+            f"<td>{len(group)}</td><td>{total_bytes / 1_000_000:.1f} MB</td></tr>"
+        )
+
+    body = (
+        f"<h1>{html.escape(title)}</h1>"
+        "<table><tr><th>Motivo</th><th>Archivos</th><th>Tamaño</th></tr>"
+        f"{''.join(index_rows)}</table>"
+    )
+    index_path = os.path.join(output_dir, "index.html")
+    with open(index_path, "w", encoding="utf-8") as f:
+        f.write(_page_html(title, body, thumb_size))
+    return index_path
+
+
+def review_thumbs(
+    report_csv: str,
+    output_dir: Optional[str] = None,
+    cache_dir: str = DEFAULT_CACHE_DIR,
+    cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+    thumb_size: int = THUMB_SIZE,
+    per_page: int = PER_PAGE,
+    workers: Optional[int] = None,
+    include_keep: bool = False,
+) -> str:
+    """Genera las hojas de contacto HTML de un reporte. Devuelve la ruta de index.html."""
+    if output_dir is None:
+        output_dir = os.path.splitext(report_csv)[0] + "_review"
+
+    items = build_thumbs(
+        report_csv,
+        cache_dir=cache_dir,
+        cache_max_bytes=cache_max_bytes,
+        thumb_size=thumb_size,
+        workers=workers,
+        include_keep=include_keep,
+    )
+    index_path = write_contact_sheets(
+        items,
+        output_dir,
+        title=os.path.basename(report_csv),
+        per_page=per_page,
+        thumb_size=thumb_size,
+    )
+    print(f"Revisión: {index_path} ({len(items)} archivos)")
+    return index_path
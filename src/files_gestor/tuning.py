@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, Optional, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+MAX_WORKERS = 64
+
+# Concurrencia inicial por tipo de trabajo: (disco rotacional, SSD, desconocido/red).
+# En HDD más workers solo añaden seeks; en NFS la latencia se oculta con más cola.
+_INITIAL_WORKERS: Dict[str, Tuple[int, int, int]] = {
+    "stat": (2, 16, 16),
+    "read": (2, 8, 8),
+    "pillow": (2, 8, 8),
+    "ffprobe": (2, os.cpu_count() or 4, 4),
+    "unlink": (1, 16, 8),
+}
+
+
+def is_rotational(path: str) -> Optional[bool]:
+    """
+    Lee queue/rotational del dispositivo de bloques que contiene path.
+
+    Devuelve None si no es un dispositivo de bloques local (NFS, tmpfs, overlay...).
+    """
+    try:
+        st_dev = os.stat(path).st_dev
+    except OSError:
+        return None
+
+    sys_path = os.path.realpath(f"/sys/dev/block/{os.major(st_dev)}:{os.minor(st_dev)}")
+    # Una partición (sda1) no tiene queue/; su disco padre (sda) sí.
+    for candidate in (sys_path, os.path.dirname(sys_path)):
+        try:
+            with open(os.path.join(candidate, "queue", "rotational"), encoding="ascii") as f:
+                return f.read().strip() == "1"
+        except OSError:
+            continue
+    return None
+
+
+def describe_device(rotational: Optional[bool]) -> str:
+    if rotational is None:
+        return "desconocido/red"
+    return "hdd" if rotational else "ssd"
+
+
+def initial_workers(kind: str, rotational: Optional[bool]) -> int:
+    hdd, ssd, unknown = _INITIAL_WORKERS[kind]
+    if rotational is None:
+        return unknown
+    return hdd if rotational else ssd
+
+
+class AutoTuner:
+    """
+    Pool de threads cuya concurrencia se ajusta durante la ejecución.
+
+    Cada ventana de tareas estima el throughput con la ley de Little
+    (tareas en vuelo / latencia media), que no depende de cuánto tarde el
+    consumidor en pedir resultados, y aplica hill-climbing AIMD:
+    +1 worker mientras mejore, x0.75 si empeora, -1 si solo crece la latencia.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        initial: int,
+        min_workers: int = 1,
+        max_workers: int = MAX_WORKERS,
+        log: Callable[[str], None] = print,
+    ) -> None:
+        self.kind = kind
+        self._log = log
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.initial = max(min_workers, min(initial, max_workers))
+        self.limit = self.initial
+        self.peak = self.initial
+
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=kind)
+        self._window_tasks = 0
+        self._window_latency = 0.0
+        self._window_in_flight = 0
+        self._last_throughput: Optional[float] = None
+        self._best_latency: Optional[float] = None
+
+    @classmethod
+    def for_path(
+        cls, kind: str, path: str, log: Callable[[str], None] = print
+    ) -> "AutoTuner":
+        rotational = is_rotational(path)
+        tuner = cls(kind, initial_workers(kind, rotational), log=log)
+        log(f"Concurrencia {kind}: inicial={tuner.limit} (disco: {describe_device(rotational)})")
+        return tuner
+
+    def _set_limit(self, limit: int) -> None:
+        self.limit = max(self.min_workers, min(limit, self.max_workers))
+        self.peak = max(self.peak, self.limit)
+
+    def _record(self, latency: float, in_flight: int) -> None:
+        self._window_tasks += 1
+        self._window_latency += latency
+        self._window_in_flight += in_flight
+        if self._window_tasks < max(16, 2 * self.limit):
+            return
+
+        mean_latency = self._window_latency / self._window_tasks
+        mean_in_flight = self._window_in_flight / self._window_tasks
+        throughput = mean_in_flight / max(mean_latency, 1e-6)
+        self._window_tasks = 0
+        self._window_latency = 0.0
+        self._window_in_flight = 0
+
+        if self._best_latency is None or mean_latency < self._best_latency:
+            self._best_latency = mean_latency
+
+        last = self._last_throughput
+        self._last_throughput = throughput
+        if last is None or throughput > last * 1.05:
+            self._set_limit(self.limit + 1)
+        elif throughput < last * 0.95:
+            self._set_limit(int(self.limit * 0.75))
+        elif mean_latency > self._best_latency * 1.5:
+            self._set_limit(self.limit - 1)
+
+    def map_unordered(self, fn: Callable[[T], R], items: Iterable[T]) -> Iterator[R]:
+        """Aplica fn a items con como mucho `limit` tareas en vuelo; orden de llegada."""
+
+        def _timed(item: T) -> Tuple[R, float]:
+            start = time.perf_counter()
+            result = fn(item)
+            return result, time.perf_counter() - start
+
+        it = iter(items)
+        pending: Set[Future] = set()
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < self.limit:
+                try:
+                    item = next(it)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.add(self._pool.submit(_timed, item))
+
+            if not pending:
+                return
+
+            in_flight = len(pending)
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                result, latency = fut.result()
+                self._record(latency, in_flight)
+                yield result
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+        self._log(
+            f"Concurrencia {self.kind}: inicial={self.initial} final={self.limit} max={self.peak}"
+        )
+
+    def __enter__(self) -> "AutoTuner":
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.close()
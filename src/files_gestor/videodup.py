@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import subprocess
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# dHash de 9x8 px en gris: 64 bits por frame, independiente de la resolución.
+HASH_WIDTH = 9
+HASH_HEIGHT = 8
+
+# Un frame es informativo si su miniatura tiene contraste (niveles de gris entre
+# el píxel más claro y el más oscuro) y su dHash no es casi todo 0 o todo 1.
+MIN_FRAME_CONTRAST = 12
+MIN_HASH_BITS = 4
+
+
+def frame_fractions(frames: int) -> List[float]:
+    """Posiciones fijas dentro del video, evitando el primer y último frame."""
+    return [(i + 1) / (frames + 1) for i in range(frames)]
+
+
+def extract_frame_hashes(
+    ffmpeg_path: str, file_path: str, duration: float, frames: int
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Extrae `frames` miniaturas de 9x8 en una sola llamada a ffmpeg y devuelve
+    su dHash (uint64) y qué frames son informativos (bool), o None si falla.
+
+    Un frame uniforme o casi (negro, fundido, color liso) da un dHash de casi
+    todo ceros que coincide con cualquier otro frame uniforme: no sirve para
+    comparar y se marca como no informativo.
+    """
+    import numpy as np
+
+    cmd = [ffmpeg_path, "-v", "error", "-nostdin"]
+    for fraction in frame_fractions(frames):
+        cmd += ["-ss", f"{duration * fraction:.3f}", "-i", file_path]
+
+    scaled = ";".join(
+        f"[{i}:v:0]scale={HASH_WIDTH}:{HASH_HEIGHT}:flags=area,format=gray,setsar=1[f{i}]"
+        for i in range(frames)
+    )
+    if frames > 1:
+        inputs = "".join(f"[f{i}]" for i in range(frames))
+        graph = f"{scaled};{inputs}vstack=inputs={frames}[out]"
+    else:
+        graph = f"{scaled};[f0]null[out]"
+
+    cmd += [
+        "-filter_complex", graph,
+        "-map", "[out]",
+        "-frames:v", "1",
+        "-f", "rawvideo",
+        "-pix_fmt", "gray",
+        "pipe:1",
+    ]
+
+    try:
+        result = subprocess.run(cmd, capture_output=True, timeout=60)
+    except (subprocess.TimeoutExpired, OSError):
+        return None
+
+    expected = HASH_WIDTH * HASH_HEIGHT * frames
+    if result.returncode != 0 or len(result.stdout) != expected:
+        return None
+
+    pixels = np.frombuffer(result.stdout, dtype=np.uint8).reshape(frames, HASH_HEIGHT, HASH_WIDTH)
+    bits = (pixels[:, :, 1:] > pixels[:, :, :-1]).reshape(frames, 64)
+    hashes = np.packbits(bits, axis=1).view(">u8").reshape(frames).astype(np.uint64)
+
+    flat = pixels.reshape(frames, -1).astype(np.int16)
+    contrast = flat.max(axis=1) - flat.min(axis=1)
+    set_bits = bits.sum(axis=1)
+    informative = (
+        (contrast >= MIN_FRAME_CONTRAST)
+        & (set_bits >= MIN_HASH_BITS)
+        & (set_bits <= 64 - MIN_HASH_BITS)
+    )
+    return hashes, informative
+
+
+def _mean_hamming(
+    one: np.ndarray,
+    one_mask: np.ndarray,
+    many: np.ndarray,
+    many_mask: np.ndarray,
+    min_frames: int,
+) -> np.ndarray:
+    """
+    Distancia de Hamming media entre one (K,) y cada fila de many (M, K), solo
+    sobre los frames informativos en ambos. inf si comparten menos de min_frames.
+    """
+    import numpy as np
+
+    xor = np.bitwise_xor(many, one)
+    per_frame = np.unpackbits(xor.view(np.uint8), axis=1).reshape(xor.shape[0], -1, 64).sum(axis=2)
+    common = many_mask & one_mask
+    counts = common.sum(axis=1)
+    dist = (per_frame * common).sum(axis=1) / np.maximum(counts, 1)
+    return np.where(counts >= min_frames, dist, np.inf)
+
+
+def is_hashable(informative: np.ndarray, min_frames: int) -> bool:
+    """Si la huella tiene suficientes frames informativos para compararla."""
+    return int(informative.sum()) >= min_frames
+
+
+def _find(parent: List[int], i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def group_near_duplicates(
+    durations: Sequence[float],
+    hashes: np.ndarray,
+    informative: np.ndarray,
+    max_distance: float,
+    tolerance_secs: float,
+    tolerance_ratio: float,
+    min_frames: int,
+) -> List[List[int]]:
+    """
+    Agrupa videos cuyas huellas difieren como mucho `max_distance` bits por frame,
+    contando solo los frames informativos en ambos videos (al menos `min_frames`).
+
+    Solo se comparan pares con duración compatible: tras ordenar por duración,
+    cada video se compara en bloque (NumPy) con la ventana de los siguientes
+    cuya duración cae dentro de la tolerancia.
+    Devuelve grupos de índices (sobre la entrada) con al menos dos videos.
+    """
+    import numpy as np
+
+    n = len(durations)
+    if n < 2:
+        return []
+
+    durs = np.asarray(durations, dtype=np.float64)
+    order = np.argsort(durs, kind="stable")
+    durs_sorted = durs[order]
+    hashes_sorted = np.ascontiguousarray(hashes[order])
+    informative_sorted = informative[order]
+
+    limits = durs_sorted + np.maximum(tolerance_secs, durs_sorted * tolerance_ratio)
+    window_ends = np.searchsorted(durs_sorted, limits, side="right")
+
+    parent = list(range(n))
+    for i in range(n - 1):
+        hi = int(window_ends[i])
+        if hi <= i + 1:
+            continue
+        dist = _mean_hamming(
+            hashes_sorted[i],
+            informative_sorted[i],
+            hashes_sorted[i + 1 : hi],
+            informative_sorted[i + 1 : hi],
+            min_frames,
+        )
+        for offset in np.nonzero(dist <= max_distance)[0]:
+            a = _find(parent, i)
+            b = _find(parent, i + 1 + int(offset))
+            if a != b:
+                parent[b] = a
+
+    groups: dict[int, List[int]] = {}
+    for pos in range(n):
+        groups.setdefault(_find(parent, pos), []).append(int(order[pos]))
+    return [members for members in groups.values() if len(members) > 1]
+
+
+def pick_keeper(
+    sizes: Sequence[int],
+    paths: Sequence[str],
+    members: List[int],
+    resolutions: Sequence[Optional[Tuple[int, int]]],
+) -> int:
+    """
+    Conserva el de mayor resolución (un re-encode a más bitrate pero reescalado
+    pesa más y es peor); a igual resolución, el mayor; empate por ruta.
+    """
+
+    def pixels(i: int) -> int:
+        resolution = resolutions[i]
+        return resolution[0] * resolution[1] if resolution is not None else 0
+
+    return max(members, key=lambda i: (pixels(i), sizes[i], paths[i]))